@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for the database layer
+Compares calling the synchronous Supabase client directly from async code
+(which blocks the event loop) with offloading it to the database thread pool.
+By default a stand-in client with fixed latency is used; pass --live to run
+get_user_profile against the Supabase project configured in .env.
+"""
+
+import sys
+import time
+import asyncio
+from dotenv import load_dotenv
+
+REQUESTS = 64
+SIMULATED_LATENCY = 0.05
+
+class SlowQuery:
+    """Stand-in for a Supabase query whose execute() blocks on network I/O"""
+
+    def execute(self):
+        time.sleep(SIMULATED_LATENCY)
+        return []
+
+async def blocking_request(query):
+    # What the handlers did before: a sync call inside an async function
+    return query.execute()
+
+async def offloaded_request(query):
+    from utils.database import run_db
+    return await run_db(query.execute)
+
+async def measure(label: str, request, query) -> float:
+    """Fire REQUESTS concurrent requests and report throughput"""
+    started_at = time.perf_counter()
+    await asyncio.gather(*[request(query) for _ in range(REQUESTS)])
+    elapsed = time.perf_counter() - started_at
+    print(f"   {label:<28} {elapsed:7.2f}s   {REQUESTS / elapsed:8.1f} req/s")
+    return elapsed
+
+async def run_benchmark(live: bool = False):
+    """Compare blocking and offloaded database calls under concurrent load"""
+    print("🔍 Benchmarking database concurrency...")
+
+    from utils.database import SUPABASE_MAX_WORKERS
+
+    if live:
+        load_dotenv()
+        from utils.database import init_supabase, get_supabase
+        await init_supabase()
+        query = get_supabase().table("profiles").select("id").limit(1)
+        print(f"\n   {REQUESTS} concurrent profile reads against Supabase ({SUPABASE_MAX_WORKERS} workers)\n")
+    else:
+        query = SlowQuery()
+        print(f"\n   {REQUESTS} concurrent requests, {SIMULATED_LATENCY * 1000:.0f} ms per call ({SUPABASE_MAX_WORKERS} workers)\n")
+
+    blocking = await measure("Blocking client calls", blocking_request, query)
+    offloaded = await measure("Database thread pool", offloaded_request, query)
+
+    print(f"\n   Speedup: {blocking / offloaded:.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark(live="--live" in sys.argv))
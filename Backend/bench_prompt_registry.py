@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the prompt registry
+Compares building a PromptTemplate and LLMChain on every request (the old
+per-handler pattern) with invoking the prebuilt registry runnables.
+Uses a local fake chat model, so no API keys are needed.
+"""
+
+import time
+import asyncio
+
+ITERATIONS = 2000
+
+async def run_benchmark():
+    """Measure per-request prompt/chain overhead with and without the registry"""
+    print("🔍 Benchmarking prompt registry...")
+
+    from langchain.prompts import PromptTemplate
+    from langchain.chains import LLMChain
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from utils.prompts import build_prompt_runnables, get_prompt, get_prompt_runnable
+
+    fake_llm = FakeListChatModel(responses=["This clause limits liability to fees paid."])
+    build_prompt_runnables(fake_llm)
+
+    spec = get_prompt("rewrite_clause")
+    inputs = {"clause": "The supplier is liable for all losses.", "instruction": "Cap liability at fees paid."}
+
+    # 1. Construction only
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        prompt = PromptTemplate(input_variables=["clause", "instruction"], template=spec.template)
+        LLMChain(llm=fake_llm, prompt=prompt)
+    per_request_build_us = (time.perf_counter() - start) / ITERATIONS * 1e6
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        get_prompt_runnable("rewrite_clause")
+    registry_lookup_us = (time.perf_counter() - start) / ITERATIONS * 1e6
+
+    # 2. Construction plus invocation against the fake model
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        prompt = PromptTemplate(input_variables=["clause", "instruction"], template=spec.template)
+        chain = LLMChain(llm=fake_llm, prompt=prompt)
+        await chain.ainvoke(inputs)
+    per_request_total_us = (time.perf_counter() - start) / ITERATIONS * 1e6
+
+    runnable = get_prompt_runnable("rewrite_clause")
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await runnable.ainvoke(inputs)
+    registry_total_us = (time.perf_counter() - start) / ITERATIONS * 1e6
+
+    print(f"\n   Iterations:                    {ITERATIONS}")
+    print(f"   Build per request:             {per_request_build_us:8.1f} µs")
+    print(f"   Registry lookup:               {registry_lookup_us:8.1f} µs")
+    print(f"   Build + invoke per request:    {per_request_total_us:8.1f} µs")
+    print(f"   Registry invoke:               {registry_total_us:8.1f} µs")
+    print(f"   Overhead removed per request:  {per_request_total_us - registry_total_us:8.1f} µs")
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
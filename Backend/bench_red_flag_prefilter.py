@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the rule-based red-flag prefilter
+Builds a long contract, runs the same section split as the sectioned red-flag
+scanner and reports its LLM calls with and without the prefilter, together with
+recall on clauses that were not used to write the rules.
+Pass --embeddings to add risk-prototype similarity (loads the embeddings model).
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+# Same defaults as the sectioned scanner in utils/llm.py
+SECTION_CHARS = int(os.getenv("RED_FLAG_SECTION_CHARS", "6000"))
+OVERVIEW_CHARS = int(os.getenv("RED_FLAG_OVERVIEW_CHARS", str(SECTION_CHARS)))
+OVERVIEW_SAMPLE_CHARS = int(os.getenv("RED_FLAG_OVERVIEW_SAMPLE_CHARS", "500"))
+
+# Times the clause sets are repeated to make a contract long enough to be sectioned
+REPEATS = 4
+
+# (clause, is_risky) pairs labeled by hand while writing the rules; recall here is optimistic
+RULE_CLAUSES = [
+    ("1. Definitions. Capitalized terms have the meanings given in this Section 1.", False),
+    ("2. Term. This Agreement shall automatically renew for successive one-year periods unless either party gives ninety days notice.", True),
+    ("3. Payment. Customer shall pay all undisputed invoices within thirty days of receipt.", False),
+    ("4. Late Payment. Overdue amounts accrue a late fee of five percent per month.", True),
+    ("5. Indemnification. Customer shall indemnify, defend and hold harmless Provider from any and all claims, whether or not caused by Provider.", True),
+    ("6. Liability. Provider's liability shall not be limited in any way under this Agreement.", True),
+    ("7. Confidentiality. Each party shall protect the other party's Confidential Information using reasonable care.", False),
+    ("8. Amendments. Provider may amend these terms at any time without notice to Customer.", True),
+    ("9. Notices. Notices shall be sent in writing to the addresses set out above.", False),
+    ("10. Governing Law. This Agreement is governed by the laws of the State of New York.", False),
+    ("11. Termination. Provider may terminate this Agreement for convenience upon written notice.", True),
+    ("12. Non-Competition. Employee shall not compete with the Company anywhere in the world for five years.", True),
+    ("13. Intellectual Property. Contractor hereby assigns all right, title and interest in the deliverables to Client.", True),
+    ("14. Warranties. The Services are provided as is and Provider disclaims all warranties.", True),
+    ("15. Disputes. The parties agree to binding arbitration and each waives any right to a jury trial.", True),
+    ("16. Counterparts. This Agreement may be executed in counterparts, each of which is an original.", False),
+    ("17. Severability. If any provision is held invalid, the remaining provisions remain in effect.", False),
+    ("18. Entire Agreement. This Agreement is the entire agreement between the parties.", False),
+    ("19. Assignment. Provider may assign this Agreement without the prior written consent of Customer.", True),
+    ("20. Force Majeure. Neither party is liable for delays caused by events beyond its reasonable control.", False),
+    ("21. Audit. Customer may audit Provider's records once per year on thirty days notice.", False),
+    ("22. Data. Provider shall process personal data only on documented instructions from Customer.", False),
+    ("23. Remedies. Replacement of the goods is Customer's sole and exclusive remedy.", True),
+    ("24. Exclusivity. Customer appoints Provider as its exclusive supplier for the Territory.", True),
+    ("25. Insurance. Provider shall maintain commercial general liability insurance of at least one million dollars.", False),
+    ("26. Suspension. Provider may suspend the Services in its sole discretion.", True),
+    ("27. Fees. Provider may increase its fees once per year with sixty days written notice.", True),
+    ("28. Headings. Headings are for convenience only and do not affect interpretation.", False),
+    ("29. Survival. Sections 5, 6 and 7 survive termination of this Agreement.", False),
+    ("30. License. Customer grants Provider a perpetual, irrevocable license to use Customer feedback.", True),
+]
+
+# (clause, is_risky) pairs written after the rules, in wording the rules were not tuned on
+HELD_OUT_CLAUSES = [
+    ("Supplier's total responsibility for losses arising under this contract is uncapped.", True),
+    ("This contract continues from year to year until one side cancels it in writing.", True),
+    ("Vendor can revise the price list whenever it chooses, effective immediately.", True),
+    ("Client gives up the right to bring any claim in court and must use the Vendor's chosen arbitrator.", True),
+    ("For three years after leaving, the Employee will not work for any business similar to the Company's.", True),
+    ("The Company may end the engagement on the spot for any reason it sees fit.", True),
+    ("Anything the Consultant creates during the engagement, including personal projects, belongs to the Company.", True),
+    ("Customer will cover every cost, claim or loss the Supplier suffers in connection with this contract.", True),
+    ("Deposits are non-refundable in all circumstances, including Supplier's failure to deliver.", True),
+    ("Provider may share Customer data with third parties for marketing purposes.", True),
+    ("Tenant is responsible for all repairs to the building, including structural defects.", True),
+    ("The Licensee may not publish benchmark results or criticism of the Software.", True),
+    ("Each party will keep the other's business information secret during the contract and for two years after.", False),
+    ("Invoices are payable within thirty days and may be disputed in good faith.", False),
+    ("Either side may end this contract on sixty days' written notice.", False),
+    ("The Supplier will deliver the goods to the Customer's warehouse by the agreed date.", False),
+    ("Each party is responsible for its own taxes arising from this contract.", False),
+    ("The parties will meet quarterly to review service levels.", False),
+    ("This contract may only be changed by a written document signed by both parties.", False),
+    ("The laws of England and Wales govern this contract.", False),
+]
+
+def numbered_contract(clauses):
+    """Number clauses as contract sections so the clause splitter sees one clause per heading"""
+    return "\n\n".join(f"{i + 1}. {clause}" for i, clause in enumerate(clauses))
+
+def recall_of(selected, labels):
+    risky = {i for i, is_risky in enumerate(labels) if is_risky}
+    found = len(set(selected) & risky)
+    return found / len(risky) if risky else 1.0, sorted(risky - set(selected))
+
+def run_benchmark(use_embeddings: bool = False):
+    """Run the prefilter the way the sectioned scanner does and report calls and recall"""
+    print("🔍 Benchmarking red-flag prefilter...")
+
+    if use_embeddings:
+        from utils.vector_store import init_embeddings
+        asyncio.run(init_embeddings())
+
+    from utils.red_flag_rules import prefilter_sections, select_suspicious_clauses
+    from utils.sections import sample_sections, split_sections
+
+    # Clause-level recall, stripped of the numbering added for the contract
+    for label, labeled in (("Rule-development clauses", RULE_CLAUSES), ("Held-out clauses", HELD_OUT_CLAUSES)):
+        clauses = [clause for clause, _ in labeled]
+        selected = select_suspicious_clauses(clauses, use_embeddings=use_embeddings)
+        recall, missed = recall_of(selected, [is_risky for _, is_risky in labeled])
+        print(f"\n   {label}: recall {recall:.2f} ({len(selected)} of {len(clauses)} selected)")
+        for i in missed:
+            print(f"      ⚠️  missed: {clauses[i][:90]}")
+
+    # Call counts on a long contract, as the sectioned scanner would make them
+    labeled = (RULE_CLAUSES + HELD_OUT_CLAUSES) * REPEATS
+    text = numbered_contract([clause for clause, _ in labeled])
+    sections = split_sections(text, max_chars=SECTION_CHARS)
+
+    start = time.perf_counter()
+    kept = prefilter_sections(sections, use_embeddings=use_embeddings)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    overviews = sample_sections(sections, OVERVIEW_CHARS, OVERVIEW_SAMPLE_CHARS)
+
+    # Where the held-out risky clauses end up: in a kept section, only in an overview sample, or nowhere
+    kept_text = "\n\n".join(section for _, section in kept)
+    overview_text = "\n\n".join(overviews)
+    held_out_risky = [clause for clause, is_risky in HELD_OUT_CLAUSES if is_risky]
+    in_kept = sum(1 for clause in held_out_risky if clause in kept_text)
+    in_overview = sum(1 for clause in held_out_risky if clause not in kept_text and clause in overview_text)
+
+    calls_without = len(sections)
+    calls_with = len(kept) + len(overviews)
+    print(f"\n   Contract:              {len(text) / 1024:.1f} KB, {len(labeled)} clauses, {len(sections)} sections")
+    print(f"   LLM calls without:     {calls_without} (one per section)")
+    print(f"   LLM calls with:        {calls_with} ({len(kept)} kept sections + {len(overviews)} overviews)")
+    print(f"   Calls saved:           {calls_without - calls_with} ({(1 - calls_with / calls_without) * 100:.0f}%)")
+    print(f"   Held-out risky clauses: {in_kept} sent in full, {in_overview} only sampled in an overview, "
+          f"{len(held_out_risky) - in_kept - in_overview} not sent")
+    print(f"   Prefilter time:        {elapsed_ms:.1f} ms")
+
+    return recall_of(
+        select_suspicious_clauses([clause for clause, _ in HELD_OUT_CLAUSES], use_embeddings=use_embeddings),
+        [is_risky for _, is_risky in HELD_OUT_CLAUSES]
+    )[0]
+
+if __name__ == "__main__":
+    run_benchmark(use_embeddings="--embeddings" in sys.argv)
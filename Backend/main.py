@@ -1,14 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+from starlette.routing import Match
 import os
 
-from routes import documents, qa, editing, auth
-from utils.database import init_supabase
+from routes import documents, qa, editing, auth, metrics
+from utils.database import init_supabase, chat_history_writer
 from utils.vector_store import init_pinecone, init_embeddings
 from utils.llm import init_llm
 from utils.auth import security
+from utils.response_cache import CACHE_BYPASS_HEADER, cache_bypass
+from utils.usage import current_endpoint
 
 # Load environment variables
 load_dotenv()
@@ -21,12 +24,14 @@ async def lifespan(app: FastAPI):
     await init_pinecone()
     await init_embeddings()
     init_llm()
+    chat_history_writer.start()
     print("🚀 LegalGenie API started successfully!")
     
     yield
     
     # Shutdown
     print("🛑 LegalGenie API shutting down...")
+    await chat_history_writer.close()
 
 app = FastAPI(
     title="LegalGenie API",
@@ -44,11 +49,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def llm_request_context(request: Request, call_next):
+    """Tag LLM calls with the matched route for usage accounting and honor `X-LLM-Cache: bypass`"""
+    endpoint = request.url.path
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            endpoint = getattr(route, "path", endpoint)
+            break
+    current_endpoint.set(f"{request.method} {endpoint}")
+    cache_bypass.set(request.headers.get(CACHE_BYPASS_HEADER, "").lower() == "bypass")
+    return await call_next(request)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(documents.router, prefix="/api/documents", tags=["Documents"])
 app.include_router(qa.router, prefix="/api/qa", tags=["Q&A"])
 app.include_router(editing.router, prefix="/api/editing", tags=["Editing"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Metrics"])
 
 
 
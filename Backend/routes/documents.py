@@ -4,14 +4,21 @@ from typing import List, Optional
 import uuid
 from datetime import datetime
 
-from utils.database import create_document, get_document, get_user_documents, update_document, delete_document, upload_file_to_bucket
+from utils.database import create_document, get_document, get_document_owner, get_user_documents, update_document, delete_document, upload_file_to_bucket, get_document_versions, get_document_version
 from utils.vector_store import store_document_chunks, delete_document_chunks
 from utils.file_processor import process_uploaded_file, is_valid_file_type, cleanup_temp_file
-from utils.llm import summarize_document
+from utils.llm import summarize_document, ANALYSIS_PROMPT_VERSIONS
+from utils.analysis_cache import get_or_create_analysis
 from utils.auth import get_current_user_id, verify_user_owns_document
 
 router = APIRouter()
 
+# Largest page of documents returned by the list endpoint
+MAX_DOCUMENTS_PAGE_SIZE = 200
+
+# Largest page of versions returned by the version history endpoint
+MAX_VERSIONS_PAGE_SIZE = 200
+
 class DocumentCreate(BaseModel):
     title: str
     content: str
@@ -82,7 +89,12 @@ async def upload_document(
         # Generate summary (skip for now to debug)
         summary = "Document uploaded successfully"
         try:
-            summary = await summarize_document(extracted_text)
+            summary, _ = await get_or_create_analysis(
+                doc_data,
+                "summary",
+                ANALYSIS_PROMPT_VERSIONS["summary"],
+                lambda: summarize_document(extracted_text)
+            )
         except Exception as e:
             print(f"Warning: Failed to generate summary: {e}")
         
@@ -286,13 +298,28 @@ async def create_new_document(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/")
-async def get_documents(user_id: str = Depends(get_current_user_id)):
-    """Get all documents for the current user"""
+async def get_documents(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Get a page of the current user's documents, newest first.
+    
+    Only listing columns are returned; fetch `/{doc_id}` for the content.
+    Pass the returned `next_cursor` to get the next page.
+    """
     try:
-        documents = await get_user_documents(user_id)
+        documents, next_cursor = await get_user_documents(
+            user_id,
+            limit=max(1, min(limit, MAX_DOCUMENTS_PAGE_SIZE)),
+            cursor=cursor
+        )
         return {
-            "documents": documents
+            "documents": documents,
+            "next_cursor": next_cursor
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -338,9 +365,10 @@ async def update_document_by_id(
         verify_user_owns_document(user_id, current_doc["user_id"])
         
         # Update document
+        # Only send content that changed: current_doc may come from a cache that is behind another worker's save
         updated_doc = await update_document(
             doc_id=doc_id, 
-            content=doc_update.content or current_doc["content"],
+            content=doc_update.content,
             title=doc_update.title
         )
         
@@ -377,7 +405,7 @@ async def delete_document_by_id(
     """Delete a document"""
     try:
         # Get current document
-        current_doc = await get_document(doc_id)
+        current_doc = await get_document_owner(doc_id)
         
         if not current_doc:
             raise HTTPException(status_code=404, detail="Document not found")
@@ -418,14 +446,88 @@ async def get_document_summary(
         # Verify user owns the document
         verify_user_owns_document(user_id, document["user_id"])
         
-        # Generate summary
-        summary = await summarize_document(document["content"])
+        # Serve the stored summary for this content, generating it on a miss
+        summary, cached = await get_or_create_analysis(
+            document,
+            "summary",
+            ANALYSIS_PROMPT_VERSIONS["summary"],
+            lambda: summarize_document(document["content"])
+        )
         
         return {
-            "summary": summary
+            "summary": summary,
+            "cached": cached
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{doc_id}/versions")
+async def list_document_versions(
+    doc_id: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Get a page of the document's version history, newest first.
+    
+    Only version metadata is returned; fetch `/{doc_id}/versions/{version_number}` for the content.
+    """
+    try:
+        document = await get_document_owner(doc_id)
+        
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        # Verify user owns the document
+        verify_user_owns_document(user_id, document["user_id"])
+        
+        versions, next_cursor = await get_document_versions(
+            doc_id,
+            limit=max(1, min(limit, MAX_VERSIONS_PAGE_SIZE)),
+            cursor=cursor
+        )
+        
+        return {
+            "versions": versions,
+            "next_cursor": next_cursor
+        }
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{doc_id}/versions/{version_number}")
+async def get_document_version_by_number(
+    doc_id: str,
+    version_number: int,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Get the title and content of a document as of a version"""
+    try:
+        document = await get_document_owner(doc_id)
+        
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        # Verify user owns the document
+        verify_user_owns_document(user_id, document["user_id"])
+        
+        version = await get_document_version(doc_id, version_number)
+        
+        if not version:
+            raise HTTPException(status_code=404, detail="Version not found")
+        
+        return {
+            "version": version
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,14 +1,38 @@
-from fastapi import APIRouter, HTTPException, Depends
+import os
+import json
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
-from utils.database import get_document, update_document
+from utils.database import get_document, get_document_owner, update_document
 from utils.vector_store import delete_document_chunks, store_document_chunks
-from utils.llm import rewrite_clause, generate_document, summarize_document
+from utils.llm import (
+    rewrite_clause,
+    generate_document,
+    summarize_document,
+    improve_language as improve_legal_language,
+    run_prompt,
+    stream_rewrite_clause,
+    stream_generate_document,
+    stream_summarize_document,
+    stream_improve_language
+)
+from utils.llm import ANALYSIS_PROMPT_VERSIONS
+from utils.analysis_cache import get_or_create_analysis
 from utils.auth import get_current_user_id, verify_user_owns_document
+from utils.sse import sse_response, stream_llm_events
+from utils.cancellation import LatestOnly, Superseded, ClientDisconnected
 
 router = APIRouter()
 
+# Wait this long before calling the LLM so rapid keystrokes replace each other for free
+AUTOCOMPLETE_DEBOUNCE_MS = int(os.getenv("AUTOCOMPLETE_DEBOUNCE_MS", "150"))
+
+# Latest auto-complete call per (user, editor session)
+autocomplete_tasks = LatestOnly()
+
 class RewriteRequest(BaseModel):
     doc_id: str
     clause: str
@@ -21,6 +45,22 @@ class GenerateDocumentRequest(BaseModel):
 class SummarizeRequest(BaseModel):
     doc_id: str
 
+class EditOperation(BaseModel):
+    op: str  # "rewrite", "improve" or "alternatives"
+    text: str
+    instruction: Optional[str] = None  # Required for "rewrite"
+
+class BatchEditRequest(BaseModel):
+    doc_id: Optional[str] = None  # Required when the batch contains rewrites
+    operations: List[EditOperation]
+    max_concurrency: int = 4
+    stream: bool = False
+
+# Limits for /batch
+MAX_BATCH_OPERATIONS = 200
+MAX_BATCH_CONCURRENCY = 8
+BATCH_OPERATIONS = {"rewrite", "improve", "alternatives"}
+
 @router.post("/rewrite-clause")
 async def rewrite_legal_clause(
     request: RewriteRequest,
@@ -29,7 +69,7 @@ async def rewrite_legal_clause(
     """Rewrite a legal clause based on instruction"""
     try:
         # Verify document ownership
-        document = await get_document(request.doc_id)
+        document = await get_document_owner(request.doc_id)
         if not document:
             raise HTTPException(status_code=404, detail="Document not found")
         
@@ -52,6 +92,35 @@ async def rewrite_legal_clause(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/rewrite-clause/stream")
+async def rewrite_legal_clause_stream(
+    request: RewriteRequest,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Rewrite a legal clause, streaming the result over server-sent events"""
+    try:
+        # Verify document ownership
+        document = await get_document_owner(request.doc_id)
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        verify_user_owns_document(user_id, document["user_id"])
+        
+        return sse_response(stream_llm_events(
+            stream_rewrite_clause(clause=request.clause, instruction=request.instruction),
+            lambda rewritten_clause: {
+                "doc_id": request.doc_id,
+                "original_clause": request.clause,
+                "rewritten_clause": rewritten_clause.strip(),
+                "instruction": request.instruction
+            }
+        ))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/generate-document")
 async def generate_new_document(
     request: GenerateDocumentRequest,
@@ -74,6 +143,25 @@ async def generate_new_document(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/generate-document/stream")
+async def generate_new_document_stream(
+    request: GenerateDocumentRequest,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Generate a new legal document, streaming it over server-sent events"""
+    try:
+        return sse_response(stream_llm_events(
+            stream_generate_document(doc_type=request.doc_type, details=request.details),
+            lambda generated_content: {
+                "doc_type": request.doc_type,
+                "content": generated_content.strip(),
+                "details": request.details
+            }
+        ))
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/summarize")
 async def summarize_document_endpoint(
     request: SummarizeRequest,
@@ -88,12 +176,18 @@ async def summarize_document_endpoint(
         
         verify_user_owns_document(user_id, document["user_id"])
         
-        # Summarize the document using LLM
-        summary = await summarize_document(document["content"])
+        # Serve the stored summary for this content, generating it on a miss
+        summary, cached = await get_or_create_analysis(
+            document,
+            "summary",
+            ANALYSIS_PROMPT_VERSIONS["summary"],
+            lambda: summarize_document(document["content"])
+        )
         
         return {
             "doc_id": request.doc_id,
-            "summary": summary
+            "summary": summary,
+            "cached": cached
         }
         
     except HTTPException:
@@ -101,42 +195,65 @@ async def summarize_document_endpoint(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/summarize/stream")
+async def summarize_document_stream(
+    request: SummarizeRequest,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Summarize a legal document, streaming the summary over server-sent events"""
+    try:
+        # Verify document ownership
+        document = await get_document(request.doc_id)
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        verify_user_owns_document(user_id, document["user_id"])
+        
+        return sse_response(stream_llm_events(
+            stream_summarize_document(document["content"]),
+            lambda summary: {
+                "doc_id": request.doc_id,
+                "summary": summary.strip()
+            }
+        ))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/auto-complete")
 async def auto_complete_text(
+    request: Request,
     text: str,
     context: Optional[str] = None,
+    session_id: Optional[str] = None,
     user_id: str = Depends(get_current_user_id)
 ):
-    """Auto-complete legal text"""
+    """Auto-complete legal text.
+    
+    Requests carrying a `session_id` cancel the previous, still running
+    completion of the same editor session, and every completion is cancelled
+    when the client disconnects. Cancelled completions release their LLM slot.
+    """
+    async def complete() -> str:
+        await asyncio.sleep(AUTOCOMPLETE_DEBOUNCE_MS / 1000)
+        return await run_prompt("auto_complete", {"text": text, "context": context or ""}, strip=False)
+    
     try:
-        from utils.llm import get_llm
-        from langchain.prompts import PromptTemplate
-        from langchain.chains import LLMChain
-        
-        template = """
-        You are a legal expert. Complete the following legal text in a natural and legally sound way:
-        
-        {text}
-        
-        Context (if any): {context}
-        
-        Please continue the text in a way that makes legal sense and follows proper legal writing conventions.
-        """
-        
-        prompt = PromptTemplate(
-            input_variables=["text", "context"],
-            template=template
-        )
-        
-        chain = LLMChain(llm=get_llm(), prompt=prompt)
-        completion = await chain.ainvoke({"text": text, "context": context or ""})
+        key = (user_id, session_id) if session_id else object()
+        completion = await autocomplete_tasks.wait(request, autocomplete_tasks.start(key, complete()))
         
         return {
             "original_text": text,
-            "completion": completion["text"],
-            "full_text": text + completion["text"]
+            "completion": completion,
+            "full_text": text + completion
         }
         
+    except Superseded:
+        raise HTTPException(status_code=409, detail="Superseded by a newer auto-complete request")
+    except ClientDisconnected:
+        raise HTTPException(status_code=499, detail="Client closed request")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -147,40 +264,34 @@ async def improve_language(
 ):
     """Improve the language and clarity of legal text"""
     try:
-        from utils.llm import get_llm
-        from langchain.prompts import PromptTemplate
-        from langchain.chains import LLMChain
-        
-        template = """
-        You are a legal writing expert. Improve the following legal text for clarity, precision, and readability while maintaining its legal meaning:
-        
-        Original text:
-        {text}
-        
-        Please provide an improved version that:
-        1. Is clearer and more readable
-        2. Uses precise legal language
-        3. Eliminates ambiguity
-        4. Maintains the original legal intent
-        5. Follows proper legal writing conventions
-        """
-        
-        prompt = PromptTemplate(
-            input_variables=["text"],
-            template=template
-        )
-        
-        chain = LLMChain(llm=get_llm(), prompt=prompt)
-        improved_text = await chain.ainvoke({"text": text})
+        improved_text = await improve_legal_language(text)
         
         return {
             "original_text": text,
-            "improved_text": improved_text["text"]
+            "improved_text": improved_text
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/improve-language/stream")
+async def improve_language_stream(
+    text: str,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Improve the language of legal text, streaming the result over server-sent events"""
+    try:
+        return sse_response(stream_llm_events(
+            stream_improve_language(text),
+            lambda improved_text: {
+                "original_text": text,
+                "improved_text": improved_text
+            }
+        ))
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/save-changes")
 async def save_document_changes(
     doc_id: str,
@@ -190,7 +301,7 @@ async def save_document_changes(
     """Save changes to a document and update vector store"""
     try:
         # Verify document ownership
-        document = await get_document(doc_id)
+        document = await get_document_owner(doc_id)
         if not document:
             raise HTTPException(status_code=404, detail="Document not found")
         
@@ -227,36 +338,113 @@ async def suggest_alternative_phrasing(
 ):
     """Suggest alternative phrasings for legal text"""
     try:
-        from utils.llm import get_llm
-        from langchain.prompts import PromptTemplate
-        from langchain.chains import LLMChain
-        
-        template = """
-        You are a legal expert. Provide 3 alternative phrasings for the following legal text, each with different levels of formality and emphasis:
-        
-        Original text:
-        {text}
-        
-        Please provide:
-        1. A more formal/technical version
-        2. A clearer/simpler version
-        3. A more comprehensive/detailed version
-        
-        For each alternative, explain the key differences and when it might be preferred.
-        """
-        
-        prompt = PromptTemplate(
-            input_variables=["text"],
-            template=template
-        )
-        
-        chain = LLMChain(llm=get_llm(), prompt=prompt)
-        alternatives = await chain.ainvoke({"text": text})
+        alternatives = await run_prompt("suggest_alternatives", {"text": text}, strip=False)
         
         return {
             "original_text": text,
-            "alternatives": alternatives["text"]
+            "alternatives": alternatives
         }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/batch")
+async def batch_edit(
+    request: BatchEditRequest,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Run a batch of clause rewrites, language improvements and alternative phrasings.
+    
+    Operations run with bounded concurrency and identical operations in the
+    batch run once. Results come back in request order, or as NDJSON in
+    completion order when `stream` is set.
+    """
+    try:
+        if not request.operations:
+            raise HTTPException(status_code=400, detail="At least one operation is required")
+        
+        if len(request.operations) > MAX_BATCH_OPERATIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"A batch may contain at most {MAX_BATCH_OPERATIONS} operations"
+            )
+        
+        for position, operation in enumerate(request.operations):
+            if operation.op not in BATCH_OPERATIONS:
+                raise HTTPException(status_code=400, detail=f"Operation {position} has unknown op '{operation.op}'")
+            if operation.op == "rewrite" and not operation.instruction:
+                raise HTTPException(status_code=400, detail=f"Operation {position} is a rewrite without an instruction")
+        
+        # Rewrites are document edits: verify ownership once for the whole batch
+        if any(operation.op == "rewrite" for operation in request.operations):
+            if not request.doc_id:
+                raise HTTPException(status_code=400, detail="doc_id is required for rewrite operations")
+            
+            document = await get_document_owner(request.doc_id)
+            if not document:
+                raise HTTPException(status_code=404, detail="Document not found")
+            
+            verify_user_owns_document(user_id, document["user_id"])
+        
+        semaphore = asyncio.Semaphore(max(1, min(request.max_concurrency, MAX_BATCH_CONCURRENCY)))
+        
+        async def run_operation(operation: EditOperation) -> str:
+            async with semaphore:
+                if operation.op == "rewrite":
+                    return await rewrite_clause(clause=operation.text, instruction=operation.instruction)
+                if operation.op == "improve":
+                    return await improve_legal_language(operation.text)
+                return await run_prompt("suggest_alternatives", {"text": operation.text}, strip=False)
+        
+        def operation_key(operation: EditOperation) -> tuple:
+            return (operation.op, operation.text, operation.instruction if operation.op == "rewrite" else None)
+        
+        # Identical operations in the batch share one task
+        shared: Dict[tuple, asyncio.Task] = {}
+        for operation in request.operations:
+            key = operation_key(operation)
+            if key not in shared:
+                shared[key] = asyncio.create_task(run_operation(operation))
+        
+        async def result_for(position: int) -> dict:
+            operation = request.operations[position]
+            
+            try:
+                result = await asyncio.shield(shared[operation_key(operation)])
+            except Exception as e:
+                return {"index": position, "op": operation.op, "error": str(e)}
+            
+            return {"index": position, "op": operation.op, "original_text": operation.text, "result": result}
+        
+        tasks = [asyncio.create_task(result_for(position)) for position in range(len(request.operations))]
+        
+        def cancel_all():
+            for task in [*tasks, *shared.values()]:
+                task.cancel()
+        
+        if not request.stream:
+            try:
+                results = await asyncio.gather(*tasks)
+            finally:
+                cancel_all()
+            return {
+                "doc_id": request.doc_id,
+                "unique_operations": len(shared),
+                "results": results
+            }
+        
+        async def stream_results():
+            try:
+                # One JSON object per line, in completion order
+                for completed in asyncio.as_completed(tasks):
+                    result = await completed
+                    yield json.dumps(result) + "\n"
+            finally:
+                cancel_all()
+        
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
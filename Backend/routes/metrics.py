@@ -0,0 +1,50 @@
+from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Depends
+
+from utils.llm_gateway import get_llm_gateway
+from utils.response_cache import get_response_cache
+from utils.usage import get_usage_tracker
+from utils.resilience import resilience_metrics
+from utils.database import chat_history_writer
+from utils.auth import get_current_user, require_metrics_admin, is_metrics_admin
+
+router = APIRouter()
+
+@router.get("/llm")
+async def get_llm_metrics(user_id: str = Depends(require_metrics_admin)):
+    """Get LLM gateway queue depth, concurrency and wait-time metrics, response cache statistics and retry/hedging counters"""
+    try:
+        return {
+            "gateway": get_llm_gateway().metrics(),
+            "response_cache": get_response_cache().stats(),
+            "resilience": resilience_metrics()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/usage")
+async def get_usage_metrics(user: Dict[str, Any] = Depends(get_current_user)):
+    """Get LLM token, latency and cost totals per endpoint, user, model and prompt.
+    
+    Only metrics admins see the full report; other users get their own totals.
+    """
+    try:
+        report = get_usage_tracker().report()
+        if is_metrics_admin(user):
+            return report
+        own_usage = report.get("by_user", {}).get(user["id"])
+        return {
+            "by_user": {user["id"]: own_usage} if own_usage else {}
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/writes")
+async def get_write_metrics(user_id: str = Depends(require_metrics_admin)):
+    """Get write-behind queue depth and batch counters"""
+    try:
+        return {
+            "chat_history": chat_history_writer.stats()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,22 +1,224 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
+import json
 
-from utils.database import get_document, get_chat_history, create_chat_history
-from utils.vector_store import search_similar_chunks
-from utils.llm import answer_question_with_context, detect_red_flags
+from utils.database import get_document, get_document_owner, get_chat_history, create_chat_history
+from utils.vector_store import search_similar_chunks, search_chunks_by_embedding, embed_query, embed_queries
+from utils.llm import answer_question_with_context, stream_answer_question_with_context, detect_red_flags, run_prompt, ANALYSIS_PROMPT_VERSIONS
+from utils.analysis_cache import get_or_create_analysis
+from utils.answer_cache import get_answer_cache, content_version
+from utils.chunk_store import ensure_document_chunks, expand_hits
 from utils.auth import get_current_user_id, verify_user_owns_document
+from utils.sse import sse_response, stream_llm_events
 
 router = APIRouter()
 
 class QuestionRequest(BaseModel):
     question: str
     doc_id: Optional[str] = None
+    neighbor_window: int = 0
 
 class RedFlagRequest(BaseModel):
     doc_id: str
     text: Optional[str] = None
 
+class BatchQuestionRequest(BaseModel):
+    doc_id: str
+    questions: List[str]
+    top_k: int = 5
+    max_concurrency: int = 4
+    neighbor_window: int = 0
+    stream: bool = True
+
+# Upper bounds for a single batch request
+MAX_BATCH_QUESTIONS = 100
+MAX_BATCH_CONCURRENCY = 8
+
+# Upper bound on the chat history page size
+MAX_CHAT_HISTORY_PAGE_SIZE = 200
+
+# Length of the snippet returned for sources that cover the whole document
+FALLBACK_SOURCE_CHARS = 500
+
+# Chunks retrieved for a streamed answer
+STREAM_TOP_K = 5
+
+# Upper bound on how many neighbors on each side a hit may be expanded to
+MAX_NEIGHBOR_WINDOW = 3
+
+# Upper bound on the chunks retrieved per question
+MAX_TOP_K = 20
+
+def format_sources(chunks: list) -> list:
+    """Build the client-facing source previews for retrieved chunks"""
+    return [
+        {
+            "text": chunk.get("metadata", {}).get("text", "")[:200] + "...",
+            "score": chunk.get("score", 0),
+            "doc_id": chunk.get("metadata", {}).get("doc_id"),
+            "title": chunk.get("metadata", {}).get("title", "Unknown")
+        }
+        for chunk in chunks
+    ]
+
+def _int_or_none(value):
+    return int(value) if value is not None else None
+
+def source_refs(chunks: list, version: str) -> list:
+    """Compact references to retrieved chunks for storing in chat history; text is not copied.
+    
+    `version` is the content version the chunks were retrieved from, so references
+    can be recognised as stale once the document is edited.
+    """
+    refs = []
+    for chunk in chunks:
+        metadata = chunk.get("metadata") or {}
+        refs.append({
+            "doc_id": metadata.get("doc_id"),
+            "chunk_id": chunk.get("id"),
+            "chunk_index": _int_or_none(metadata.get("chunk_index")),
+            "score": round(float(chunk.get("score") or 0), 4),
+            "start": _int_or_none(metadata.get("start_offset")),
+            "end": _int_or_none(metadata.get("end_offset")),
+            "version": version
+        })
+    return refs
+
+def hydrate_sources(document: dict, refs: list) -> list:
+    """Resolve stored source references to their text from the document's chunk layout.
+    
+    References made against an earlier version of the content are returned
+    with `stale: true` and no text, since their positions no longer match.
+    Rows written before sources were stored as references still carry the
+    full chunk metadata and are passed through.
+    """
+    version = content_version(document["content"])
+    layout = None
+    sources = []
+    for ref in refs or []:
+        if "text" in ref:
+            sources.append(ref)
+            continue
+        
+        source = {**ref, "title": document.get("title", "Unknown")}
+        if ref.get("version") != version:
+            sources.append({**source, "stale": True})
+            continue
+        
+        if layout is None:
+            layout = ensure_document_chunks(document["id"], document["content"])
+        
+        index = ref.get("chunk_index")
+        if index is not None and 0 <= index < len(layout):
+            text = layout[index]["text"]
+        elif ref.get("start") is not None:
+            text = document["content"][ref["start"]:ref["end"]]
+        else:
+            # Refs from the whole-document fallback carry no chunk position: return a snippet
+            text = document["content"][:FALLBACK_SOURCE_CHARS]
+            if len(document["content"]) > FALLBACK_SOURCE_CHARS:
+                text += "..."
+        
+        sources.append({**source, "text": text, "stale": False})
+    return sources
+
+def answer_cache_version(document: dict, top_k: int, neighbor_window: int) -> str:
+    """Cache version for answers about a document's current content and retrieval settings"""
+    return f"{content_version(document['content'])}:k{top_k}:w{neighbor_window}"
+
+async def retrieve_context(
+    document: dict,
+    query_embedding: Optional[List[float]],
+    top_k: int = 5,
+    neighbor_window: int = 0
+) -> tuple:
+    """Retrieve the chunks for a question and build the LLM context from them.
+    
+    Returns the chunks, the context and whether retrieval fell back to the whole
+    document because vector search failed.
+    """
+    doc_id = document["id"]
+    
+    # Search for relevant chunks in the specific document
+    try:
+        if query_embedding is None:
+            raise RuntimeError("query embedding unavailable")
+        chunks = await search_chunks_by_embedding(query_embedding, doc_id=doc_id, top_k=top_k)
+        fallback = False
+    except Exception as e:
+        print(f"Warning: Vector search failed, using document content: {e}")
+        # Fallback: use the entire document content
+        chunks = [{"metadata": {"text": document["content"]}, "score": 1.0}]
+        neighbor_window = 0
+        fallback = True
+    
+    # Extract text from chunks
+    context_chunks = [chunk.get("metadata", {}).get("text", "") for chunk in chunks if chunk.get("metadata")]
+    
+    # Expand hits to their neighboring chunks from the local layout, without extra vector queries
+    if neighbor_window > 0:
+        layout = ensure_document_chunks(doc_id, document["content"])
+        hit_indices, unmatched = [], []
+        for chunk in chunks:
+            metadata = chunk.get("metadata") or {}
+            index = metadata.get("chunk_index")
+            # Vectors left over from an earlier version (e.g. re-indexing failed) keep their own text
+            if index is not None and 0 <= int(index) < len(layout) and layout[int(index)]["text"] == metadata.get("text"):
+                hit_indices.append(int(index))
+            elif metadata:
+                unmatched.append(metadata.get("text", ""))
+        spans = expand_hits(layout, hit_indices, window=neighbor_window)
+        if spans:
+            context_chunks = [span["text"] for span in spans] + unmatched
+    
+    return chunks, context_chunks, fallback
+
+async def answer_from_document(
+    document: dict,
+    question: str,
+    query_embedding: Optional[List[float]],
+    top_k: int = 5,
+    llm_semaphore: Optional[asyncio.Semaphore] = None,
+    neighbor_window: int = 0
+) -> dict:
+    """Answer a question about one document, serving from the answer cache when possible"""
+    doc_id = document["id"]
+    top_k = max(1, min(top_k, MAX_TOP_K))
+    neighbor_window = max(0, min(neighbor_window, MAX_NEIGHBOR_WINDOW))
+    version = answer_cache_version(document, top_k, neighbor_window)
+    cache = get_answer_cache()
+    
+    if query_embedding is not None:
+        cached = cache.lookup(doc_id, version, query_embedding)
+        if cached:
+            return {"answer": cached["answer"], "chunks": cached["chunks"], "cached": True}
+    
+    chunks, context_chunks, fallback = await retrieve_context(document, query_embedding, top_k, neighbor_window)
+    
+    # Generate answer using LLM
+    if llm_semaphore is not None:
+        async with llm_semaphore:
+            answer = await answer_question_with_context(question=question, context_chunks=context_chunks)
+    else:
+        answer = await answer_question_with_context(question=question, context_chunks=context_chunks)
+    
+    # Answers from the whole-document fallback are degraded; don't serve them again
+    if query_embedding is not None and not fallback:
+        cache.store(doc_id, version, question, query_embedding, answer, chunks)
+    
+    return {"answer": answer, "chunks": chunks, "cached": False}
+
+async def embed_question(question: str) -> Optional[List[float]]:
+    """Embed a question off the event loop, returning None if embedding fails"""
+    try:
+        return await asyncio.to_thread(embed_query, question)
+    except Exception as e:
+        print(f"Warning: Query embedding failed: {e}")
+        return None
+
 @router.post("/ask")
 async def ask_question(
     request: QuestionRequest,
@@ -33,27 +235,30 @@ async def ask_question(
             
             verify_user_owns_document(user_id, document["user_id"])
             
-            # Search for relevant chunks in the specific document
-            try:
-                chunks = await search_similar_chunks(
-                    query=request.question,
-                    doc_id=request.doc_id,
-                    top_k=5
-                )
-            except Exception as e:
-                print(f"Warning: Vector search failed, using document content: {e}")
-                # Fallback: use the entire document content
-                chunks = [{"metadata": {"text": document["content"]}, "score": 1.0}]
-        else:
-            # Search across all user documents
-            try:
-                chunks = await search_similar_chunks(
-                    query=request.question,
-                    top_k=5
-                )
-            except Exception as e:
-                print(f"Warning: Vector search failed: {e}")
-                chunks = []
+            query_embedding = await embed_question(request.question)
+            result = await answer_from_document(
+                document,
+                request.question,
+                query_embedding,
+                neighbor_window=request.neighbor_window
+            )
+            
+            return {
+                "question": request.question,
+                "answer": result["answer"],
+                "sources": format_sources(result["chunks"]),
+                "cached": result["cached"]
+            }
+        
+        # Search across all user documents
+        try:
+            chunks = await search_similar_chunks(
+                query=request.question,
+                top_k=5
+            )
+        except Exception as e:
+            print(f"Warning: Vector search failed: {e}")
+            chunks = []
         
         # Extract text from chunks
         context_chunks = [chunk.get("metadata", {}).get("text", "") for chunk in chunks if chunk.get("metadata")]
@@ -67,15 +272,7 @@ async def ask_question(
         return {
             "question": request.question,
             "answer": answer,
-            "sources": [
-                {
-                    "text": chunk.get("metadata", {}).get("text", "")[:200] + "...",
-                    "score": chunk.get("score", 0),
-                    "doc_id": chunk.get("metadata", {}).get("doc_id"),
-                    "title": chunk.get("metadata", {}).get("title", "Unknown")
-                }
-                for chunk in chunks
-            ]
+            "sources": format_sources(chunks)
         }
         
     except HTTPException:
@@ -83,6 +280,167 @@ async def ask_question(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/ask/stream")
+async def ask_question_stream(
+    request: QuestionRequest,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Ask a question about a document, streaming the answer over server-sent events"""
+    try:
+        if request.doc_id:
+            # Verify document ownership
+            document = await get_document(request.doc_id)
+            if not document:
+                raise HTTPException(status_code=404, detail="Document not found")
+            
+            verify_user_owns_document(user_id, document["user_id"])
+            
+            neighbor_window = max(0, min(request.neighbor_window, MAX_NEIGHBOR_WINDOW))
+            version = answer_cache_version(document, STREAM_TOP_K, neighbor_window)
+            query_embedding = await embed_question(request.question)
+            
+            cached = None
+            fallback = False
+            if query_embedding is not None:
+                cached = get_answer_cache().lookup(request.doc_id, version, query_embedding)
+            
+            if cached:
+                async def cached_tokens():
+                    yield cached["answer"]
+                
+                tokens = cached_tokens()
+                chunks = cached["chunks"]
+            else:
+                chunks, context_chunks, fallback = await retrieve_context(
+                    document,
+                    query_embedding,
+                    top_k=STREAM_TOP_K,
+                    neighbor_window=neighbor_window
+                )
+                tokens = stream_answer_question_with_context(request.question, context_chunks)
+            
+            def build_final(answer: str) -> dict:
+                answer = answer.strip()
+                if not cached and not fallback and query_embedding is not None:
+                    get_answer_cache().store(request.doc_id, version, request.question, query_embedding, answer, chunks)
+                
+                return {
+                    "question": request.question,
+                    "answer": answer,
+                    "sources": format_sources(chunks),
+                    "cached": bool(cached)
+                }
+            
+            return sse_response(stream_llm_events(tokens, build_final))
+        
+        # Search across all user documents
+        try:
+            chunks = await search_similar_chunks(
+                query=request.question,
+                top_k=5
+            )
+        except Exception as e:
+            print(f"Warning: Vector search failed: {e}")
+            chunks = []
+        
+        context_chunks = [chunk.get("metadata", {}).get("text", "") for chunk in chunks if chunk.get("metadata")]
+        
+        return sse_response(stream_llm_events(
+            stream_answer_question_with_context(request.question, context_chunks),
+            lambda answer: {
+                "question": request.question,
+                "answer": answer.strip(),
+                "sources": format_sources(chunks)
+            }
+        ))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/ask-batch")
+async def ask_questions_batch(
+    request: BatchQuestionRequest,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Answer a batch of questions about one document, streaming answers as they complete"""
+    try:
+        if not request.questions:
+            raise HTTPException(status_code=400, detail="At least one question is required")
+        
+        if len(request.questions) > MAX_BATCH_QUESTIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"A batch may contain at most {MAX_BATCH_QUESTIONS} questions"
+            )
+        
+        # Fetch the document and verify ownership once for the whole batch
+        document = await get_document(request.doc_id)
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        verify_user_owns_document(user_id, document["user_id"])
+        
+        # Embed every question in one batch; retrieval then runs per question concurrently
+        try:
+            query_embeddings = await asyncio.to_thread(embed_queries, request.questions)
+        except Exception as e:
+            print(f"Warning: Batch embedding failed, using document content: {e}")
+            query_embeddings = [None] * len(request.questions)
+        
+        # Bound the number of concurrent LLM calls
+        semaphore = asyncio.Semaphore(max(1, min(request.max_concurrency, MAX_BATCH_CONCURRENCY)))
+        
+        async def answer_one(position: int) -> dict:
+            question = request.questions[position]
+            
+            try:
+                result = await answer_from_document(
+                    document,
+                    question,
+                    query_embeddings[position],
+                    top_k=request.top_k,
+                    llm_semaphore=semaphore,
+                    neighbor_window=request.neighbor_window
+                )
+            except Exception as e:
+                return {"index": position, "question": question, "error": str(e)}
+            
+            return {
+                "index": position,
+                "question": question,
+                "answer": result["answer"],
+                "sources": format_sources(result["chunks"]),
+                "cached": result["cached"]
+            }
+        
+        tasks = [asyncio.create_task(answer_one(position)) for position in range(len(request.questions))]
+        
+        if not request.stream:
+            results = await asyncio.gather(*tasks)
+            return {
+                "doc_id": request.doc_id,
+                "results": results
+            }
+        
+        async def stream_answers():
+            try:
+                # One JSON object per line, in completion order
+                for completed in asyncio.as_completed(tasks):
+                    result = await completed
+                    yield json.dumps(result) + "\n"
+            finally:
+                for task in tasks:
+                    task.cancel()
+        
+        return StreamingResponse(stream_answers(), media_type="application/x-ndjson")
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/red-flags")
 async def detect_red_flags_in_document(
     request: RedFlagRequest,
@@ -100,12 +458,20 @@ async def detect_red_flags_in_document(
         # Use provided text or document content
         text_to_analyze = request.text if request.text else document["content"]
         
-        # Detect red flags
-        red_flags = await detect_red_flags(text_to_analyze)
+        # Detect red flags, reusing the stored analysis of the same text
+        red_flags, cached = await get_or_create_analysis(
+            document,
+            "red_flags",
+            ANALYSIS_PROMPT_VERSIONS["red_flags"],
+            lambda: detect_red_flags(text_to_analyze),
+            text=text_to_analyze,
+            is_cacheable=lambda result: result.get("overall_risk_level") != "unknown"
+        )
         
         return {
             "doc_id": request.doc_id,
-            "red_flags": red_flags
+            "red_flags": red_flags,
+            "cached": cached
         }
         
     except HTTPException:
@@ -145,35 +511,17 @@ async def get_document_suggestions(
         
         verify_user_owns_document(user_id, document["user_id"])
         
-        # Generate suggestions using LLM
-        suggestions_prompt = f"""
-        Analyze this legal document and provide specific suggestions for improvement:
-        
-        {document['content']}
-        
-        Please provide suggestions in the following areas:
-        1. Clarity and readability
-        2. Legal completeness
-        3. Risk mitigation
-        4. Missing clauses
-        5. Ambiguous language
-        """
-        
-        from utils.llm import get_llm
-        from langchain.prompts import PromptTemplate
-        from langchain.chains import LLMChain
-        
-        template = PromptTemplate(
-            input_variables=["content"],
-            template=suggestions_prompt
+        suggestions, cached = await get_or_create_analysis(
+            document,
+            "suggestions",
+            ANALYSIS_PROMPT_VERSIONS["suggestions"],
+            lambda: run_prompt("suggestions", {"content": document["content"]}, strip=False)
         )
         
-        chain = LLMChain(llm=get_llm(), prompt=template)
-        suggestions = await chain.ainvoke({"content": document['content']})
-        
         return {
             "doc_id": doc_id,
-            "suggestions": suggestions["text"]
+            "suggestions": suggestions,
+            "cached": cached
         }
         
     except HTTPException:
@@ -184,26 +532,46 @@ async def get_document_suggestions(
 @router.get("/chat-history/{doc_id}")
 async def get_chat_history_for_document(
     doc_id: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    include_sources: bool = False,
     user_id: str = Depends(get_current_user_id)
 ):
-    """Get chat history for a specific document"""
+    """Get a page of chat history for a specific document, newest first.
+    
+    Pass the returned `next_cursor` to load older messages. With `include_sources`
+    the stored source references are resolved to their chunk text.
+    """
     try:
-        # Verify document ownership
-        document = await get_document(doc_id)
+        # Verify document ownership; content is only needed to resolve sources
+        document = await (get_document(doc_id) if include_sources else get_document_owner(doc_id))
         if not document:
             raise HTTPException(status_code=404, detail="Document not found")
         
         verify_user_owns_document(user_id, document["user_id"])
         
         # Get chat history
-        chat_history = await get_chat_history(user_id, doc_id)
+        chat_history, next_cursor = await get_chat_history(
+            user_id,
+            doc_id,
+            limit=max(1, min(limit, MAX_CHAT_HISTORY_PAGE_SIZE)),
+            cursor=cursor,
+            include_sources=include_sources
+        )
+        
+        if include_sources:
+            for entry in chat_history:
+                entry["sources"] = hydrate_sources(document, entry.get("sources"))
         
         return {
-            "chat_history": chat_history
+            "chat_history": chat_history,
+            "next_cursor": next_cursor
         }
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -222,26 +590,15 @@ async def add_chat_message(
         
         verify_user_owns_document(user_id, document["user_id"])
         
-        # Search for relevant chunks
-        try:
-            chunks = await search_similar_chunks(
-                query=request.question,
-                doc_id=doc_id,
-                top_k=5
-            )
-        except Exception as e:
-            print(f"Warning: Vector search failed, using document content: {e}")
-            # Fallback: use the entire document content
-            chunks = [{"metadata": {"text": document["content"]}, "score": 1.0}]
-        
-        # Extract text from chunks
-        context_chunks = [chunk.get("metadata", {}).get("text", "") for chunk in chunks if chunk.get("metadata")]
-        
-        # Generate answer using LLM
-        answer = await answer_question_with_context(
-            question=request.question,
-            context_chunks=context_chunks
+        query_embedding = await embed_question(request.question)
+        result = await answer_from_document(
+            document,
+            request.question,
+            query_embedding,
+            neighbor_window=request.neighbor_window
         )
+        answer = result["answer"]
+        chunks = result["chunks"]
         
         # Save to chat history
         chat_entry = await create_chat_history(
@@ -249,22 +606,14 @@ async def add_chat_message(
             document_id=doc_id,
             question=request.question,
             answer=answer,
-            sources=[chunk.get("metadata", {}) for chunk in chunks]
+            sources=source_refs(chunks, content_version(document["content"]))
         )
         
         return {
             "question": request.question,
             "answer": answer,
             "chat_id": chat_entry["id"],
-            "sources": [
-                {
-                    "text": chunk.get("metadata", {}).get("text", "")[:200] + "...",
-                    "score": chunk.get("score", 0),
-                    "doc_id": chunk.get("metadata", {}).get("doc_id"),
-                    "title": chunk.get("metadata", {}).get("title", "Unknown")
-                }
-                for chunk in chunks
-            ]
+            "sources": format_sources(chunks)
         }
         
     except HTTPException:
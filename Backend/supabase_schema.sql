@@ -42,7 +42,12 @@ CREATE TABLE IF NOT EXISTS document_versions (
     document_id UUID REFERENCES documents(id) ON DELETE CASCADE NOT NULL,
     user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE NOT NULL,
     version_number INTEGER NOT NULL,
-    content TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'snapshot', -- 'snapshot' (full content) or 'delta'
+    base_version INTEGER, -- version a delta applies to
+    content TEXT, -- full content, snapshots only
+    delta TEXT, -- compressed tag/sentence-level delta against base_version, deltas only
+    content_hash TEXT, -- hash of the version's full content
+    size_bytes INTEGER, -- stored size of content or delta
     title TEXT NOT NULL,
     change_description TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
@@ -57,6 +62,8 @@ CREATE TABLE IF NOT EXISTS document_analyses (
     user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE NOT NULL,
     analysis_type TEXT NOT NULL, -- 'red_flags', 'summary', 'suggestions'
     analysis_data JSONB NOT NULL,
+    content_hash TEXT, -- hash of the analyzed text
+    prompt_version TEXT, -- version of the prompt that produced the analysis
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -78,10 +85,22 @@ CREATE TABLE IF NOT EXISTS chat_history (
 -- ========================================
 CREATE INDEX IF NOT EXISTS idx_documents_user_id ON documents(user_id);
 CREATE INDEX IF NOT EXISTS idx_documents_created_at ON documents(created_at DESC);
+-- Keyset pagination of a user's document list (newest first)
+CREATE INDEX IF NOT EXISTS idx_documents_user_created_at ON documents(user_id, created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_document_versions_document_id ON document_versions(document_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_document_versions_document_version
+    ON document_versions(document_id, version_number);
+-- Keyset pagination of a document's version history (newest first)
+CREATE INDEX IF NOT EXISTS idx_document_versions_document_created_at
+    ON document_versions(document_id, created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_document_analyses_document_id ON document_analyses(document_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_document_analyses_cache_key
+    ON document_analyses(document_id, analysis_type, content_hash, prompt_version);
 CREATE INDEX IF NOT EXISTS idx_chat_history_user_id ON chat_history(user_id);
 CREATE INDEX IF NOT EXISTS idx_chat_history_document_id ON chat_history(document_id);
+-- Keyset pagination of a user's chat history per document (newest first)
+CREATE INDEX IF NOT EXISTS idx_chat_history_user_document_created_at
+    ON chat_history(user_id, document_id, created_at DESC, id DESC);
 
 -- ========================================
 -- ROW LEVEL SECURITY (RLS) POLICIES
@@ -131,6 +150,12 @@ CREATE POLICY "Users can view own document analyses" ON document_analyses
 CREATE POLICY "Users can insert own document analyses" ON document_analyses
     FOR INSERT WITH CHECK (auth.uid() = user_id);
 
+CREATE POLICY "Users can update own document analyses" ON document_analyses
+    FOR UPDATE USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can delete own document analyses" ON document_analyses
+    FOR DELETE USING (auth.uid() = user_id);
+
 -- Chat history policies
 CREATE POLICY "Users can view own chat history" ON chat_history
     FOR SELECT USING (auth.uid() = user_id);
@@ -184,30 +209,10 @@ CREATE TRIGGER on_auth_user_created
     AFTER INSERT ON auth.users
     FOR EACH ROW EXECUTE FUNCTION handle_new_user();
 
--- Function to create document version on update
-CREATE OR REPLACE FUNCTION create_document_version()
-RETURNS TRIGGER AS $$
-BEGIN
-    -- Only create version if content or title changed
-    IF OLD.content IS DISTINCT FROM NEW.content OR OLD.title IS DISTINCT FROM NEW.title THEN
-        INSERT INTO document_versions (document_id, user_id, version_number, content, title)
-        SELECT 
-            NEW.id,
-            NEW.user_id,
-            COALESCE(MAX(version_number), 0) + 1,
-            NEW.content,
-            NEW.title
-        FROM document_versions
-        WHERE document_id = NEW.id;
-    END IF;
-    RETURN NEW;
-END;
-$$ LANGUAGE plpgsql;
-
--- Trigger for document versioning
-CREATE TRIGGER on_document_update
-    AFTER UPDATE ON documents
-    FOR EACH ROW EXECUTE FUNCTION create_document_version();
+-- Versions are written by the API as delta-encoded rows (see record_document_version
+-- in utils/database.py); drop the trigger that stored a full copy on every update
+DROP TRIGGER IF EXISTS on_document_update ON documents;
+DROP FUNCTION IF EXISTS create_document_version();
 
 -- ========================================
 -- STORAGE BUCKET SETUP
@@ -315,4 +320,7 @@ COMMENT ON TABLE chat_history IS 'Q&A conversation history with AI assistant';
 
 COMMENT ON COLUMN documents.metadata IS 'Additional metadata in JSON format';
 COMMENT ON COLUMN document_analyses.analysis_data IS 'JSON data containing analysis results';
-COMMENT ON COLUMN chat_history.sources IS 'JSON array of source documents used for answers'; 
\ No newline at end of file
+COMMENT ON COLUMN document_analyses.content_hash IS 'Hash of the analyzed text, used as the analysis cache key';
+COMMENT ON COLUMN document_analyses.prompt_version IS 'Prompt version that produced the analysis, used as the analysis cache key';
+COMMENT ON COLUMN chat_history.sources IS 'JSON array of source documents used for answers';
+COMMENT ON COLUMN document_versions.delta IS 'Base64 zlib-compressed tag/sentence-level delta against base_version; NULL for snapshots'; 
\ No newline at end of file
@@ -0,0 +1,42 @@
+-- LegalGenie Schema Upgrade
+-- Run this in your Supabase SQL Editor on a database created from an earlier
+-- supabase_schema.sql. Every statement is idempotent, so it is safe to re-run.
+-- (supabase_schema.sql itself is for new databases: its policies and triggers
+-- cannot be created twice.)
+
+-- ========================================
+-- DOCUMENT_ANALYSES: analysis cache key
+-- ========================================
+ALTER TABLE document_analyses ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE document_analyses ADD COLUMN IF NOT EXISTS prompt_version TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_document_analyses_cache_key
+    ON document_analyses(document_id, analysis_type, content_hash, prompt_version);
+
+-- ========================================
+-- KEYSET PAGINATION INDEXES
+-- ========================================
+CREATE INDEX IF NOT EXISTS idx_documents_user_created_at ON documents(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_chat_history_user_document_created_at
+    ON chat_history(user_id, document_id, created_at DESC, id DESC);
+
+-- ========================================
+-- DOCUMENT_VERSIONS: delta-encoded version history
+-- ========================================
+ALTER TABLE document_versions ADD COLUMN IF NOT EXISTS kind TEXT NOT NULL DEFAULT 'snapshot';
+ALTER TABLE document_versions ADD COLUMN IF NOT EXISTS base_version INTEGER;
+ALTER TABLE document_versions ADD COLUMN IF NOT EXISTS delta TEXT;
+ALTER TABLE document_versions ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE document_versions ADD COLUMN IF NOT EXISTS size_bytes INTEGER;
+ALTER TABLE document_versions ALTER COLUMN content DROP NOT NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_document_versions_document_version
+    ON document_versions(document_id, version_number);
+CREATE INDEX IF NOT EXISTS idx_document_versions_document_created_at
+    ON document_versions(document_id, created_at DESC, id DESC);
+
+-- Versions are written by the API; drop the trigger that stored a full copy on every update
+DROP TRIGGER IF EXISTS on_document_update ON documents;
+DROP FUNCTION IF EXISTS create_document_version();
+
+COMMENT ON COLUMN document_versions.delta IS 'Base64 zlib-compressed tag/sentence-level delta against base_version; NULL for snapshots';
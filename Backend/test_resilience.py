@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script for the resilience layer (deadlines, retries, hedging)
+Uses a local fault-injecting stand-in for Gemini/Pinecone, so no services are needed
+"""
+
+import time
+import asyncio
+
+class FlakyService:
+    """Stand-in remote service that fails or stalls on chosen calls"""
+
+    def __init__(self, failures=(), stalls=(), stall_seconds=5.0, latency=0.01):
+        self.failures = set(failures)
+        self.stalls = set(stalls)
+        self.stall_seconds = stall_seconds
+        self.latency = latency
+        self.calls = 0
+
+    async def call(self):
+        self.calls += 1
+        call_number = self.calls
+        if call_number in self.failures:
+            await asyncio.sleep(self.latency)
+            raise ConnectionError(f"injected failure on call {call_number}")
+        await asyncio.sleep(self.stall_seconds if call_number in self.stalls else self.latency)
+        return f"response {call_number}"
+
+def check(label, condition, failures):
+    print(f"   {'✅' if condition else '❌'} {label}")
+    if not condition:
+        failures.append(label)
+
+async def test_resilience():
+    """Exercise each resilience behaviour against injected faults"""
+    print("🔍 Testing resilience layer...")
+
+    from utils.resilience import ResiliencePolicy, DeadlineExceeded
+
+    failures = []
+
+    # Test 1: Transient errors are retried
+    print("\n1. Retrying transient failures...")
+    service = FlakyService(failures={1, 2})
+    policy = ResiliencePolicy("test", timeout=1.0, retries=2, base_delay=0.01)
+    result = await policy.run(service.call)
+    check(f"Succeeded on attempt {service.calls} after two injected failures", result == "response 3", failures)
+    check("Counted two retries", policy.retried == 2, failures)
+
+    # Test 2: A hung call hits its deadline and is retried
+    print("\n2. Enforcing per-call deadlines...")
+    service = FlakyService(stalls={1})
+    policy = ResiliencePolicy("test", timeout=0.1, retries=1, base_delay=0.01)
+    started_at = time.monotonic()
+    result = await policy.run(service.call)
+    elapsed = time.monotonic() - started_at
+    check(f"Hung call timed out and the retry answered in {elapsed:.2f}s", result == "response 2" and elapsed < 1.0, failures)
+    check("Counted one timeout", policy.timeouts == 1, failures)
+
+    # Test 3: Exhausted retries surface the error
+    print("\n3. Giving up after the retry budget...")
+    service = FlakyService(stalls={1, 2})
+    policy = ResiliencePolicy("test", timeout=0.05, retries=1, base_delay=0.01)
+    try:
+        await policy.run(service.call)
+        check("Raised DeadlineExceeded", False, failures)
+    except DeadlineExceeded:
+        check("Raised DeadlineExceeded after two hung attempts", service.calls == 2, failures)
+
+    # Test 4: A slow primary is beaten by a hedged duplicate
+    print("\n4. Hedging slow calls...")
+    service = FlakyService(stalls={1}, stall_seconds=2.0)
+    policy = ResiliencePolicy("test", timeout=5.0, retries=0, hedge=True, hedge_delay=0.05)
+    started_at = time.monotonic()
+    result = await policy.run(service.call)
+    elapsed = time.monotonic() - started_at
+    check(f"Hedged request answered in {elapsed:.2f}s instead of 2s", result == "response 2" and elapsed < 0.5, failures)
+    check("Counted one hedge win", policy.hedges == 1 and policy.hedge_wins == 1, failures)
+
+    # Test 5: Fast calls never hedge
+    print("\n5. Leaving fast calls alone...")
+    service = FlakyService()
+    policy = ResiliencePolicy("test", timeout=1.0, retries=0, hedge=True, hedge_delay=0.5)
+    for _ in range(5):
+        await policy.run(service.call)
+    check("No duplicate requests for fast calls", service.calls == 5 and policy.hedges == 0, failures)
+
+    # Test 6: Long-tier LLM calls get their own deadline and are not retried after it
+    print("\n6. Long-tier deadlines...")
+    from utils.model_router import ModelTier
+    from utils.resilience import llm_policy
+    service = FlakyService(stalls={1}, stall_seconds=1.0)
+    policy = llm_policy(ModelTier("long", "fake", 8192, 0.3, timeout=0.05))
+    try:
+        await policy.run(service.call)
+        timed_out = False
+    except DeadlineExceeded:
+        timed_out = True
+    check("Timed out once without a retry", timed_out and service.calls == 1, failures)
+    standard = llm_policy(ModelTier("standard", "fake", 2048, 0.3, timeout=7.0))
+    check("Standard tier keeps its own deadline and retries", standard.timeout == 7.0 and not standard.no_retry_on, failures)
+
+    print(f"\n❌ {len(failures)} resilience checks failed" if failures else "\n🎉 All resilience checks passed!")
+    return not failures
+
+if __name__ == "__main__":
+    asyncio.run(test_resilience())
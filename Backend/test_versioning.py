@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script for delta-encoded version history
+Replays a series of edits on a synthetic contract, checks that every version
+is rebuilt exactly and compares stored bytes with keeping a full copy per save
+"""
+
+import random
+
+CLAUSES = 400
+EDITS = 60
+SNAPSHOT_INTERVAL = 20
+
+def synthetic_contract(rng: random.Random) -> str:
+    words = ["party", "agreement", "shall", "notice", "term", "confidential", "payment", "liability", "services", "law"]
+    paragraphs = [
+        f"{i + 1}. " + " ".join(rng.choice(words) for _ in range(rng.randint(20, 60))) + "."
+        for i in range(CLAUSES)
+    ]
+    return "\n\n".join(paragraphs) + "\n"
+
+def edit(content: str, rng: random.Random) -> str:
+    """Rewrite, insert or delete a random paragraph, as an editor save would"""
+    paragraphs = content.split("\n\n")
+    position = rng.randrange(len(paragraphs))
+    action = rng.choice(["rewrite", "insert", "delete"])
+    if action == "rewrite":
+        paragraphs[position] = paragraphs[position].replace("shall", "must", 1) + " As amended."
+    elif action == "insert":
+        paragraphs.insert(position, "New clause: the parties agree to negotiate in good faith.")
+    elif len(paragraphs) > 1:
+        del paragraphs[position]
+    return "\n\n".join(paragraphs)
+
+def test_versioning():
+    """Round-trip every version through the delta chain"""
+    print("🔍 Testing delta-encoded version history...")
+
+    from utils.versioning import encode_delta, apply_delta
+
+    rng = random.Random(7)
+    versions = [synthetic_contract(rng)]
+    for _ in range(EDITS):
+        versions.append(edit(versions[-1], rng))
+
+    # Store as the API does: a snapshot every SNAPSHOT_INTERVAL versions, deltas in between
+    stored = []
+    for number, content in enumerate(versions):
+        if number % SNAPSHOT_INTERVAL == 0:
+            stored.append(("snapshot", content))
+        else:
+            stored.append(("delta", encode_delta(versions[number - 1], content)))
+
+    failures = 0
+    for number in range(len(versions)):
+        snapshot = number - number % SNAPSHOT_INTERVAL
+        content = stored[snapshot][1]
+        for kind, delta in stored[snapshot + 1:number + 1]:
+            content = apply_delta(content, delta)
+        if content != versions[number]:
+            failures += 1
+            print(f"   ❌ Version {number + 1} was not rebuilt exactly")
+
+    full_bytes = sum(len(content.encode("utf-8")) for content in versions)
+    delta_sizes = [len(data) for kind, data in stored if kind == "delta"]
+    stored_bytes = sum(len(data.encode("utf-8")) for kind, data in stored)
+
+    print(f"\n   Document size:            {len(versions[0]) / 1024:8.1f} KB")
+    print(f"   Versions:                 {len(versions):8d}")
+    print(f"   Mean delta size:          {sum(delta_sizes) / len(delta_sizes):8.0f} bytes")
+    print(f"   Full copy per save:       {full_bytes / 1024:8.1f} KB")
+    print(f"   Snapshots + deltas:       {stored_bytes / 1024:8.1f} KB")
+    print(f"   Longest rebuild chain:    {SNAPSHOT_INTERVAL - 1:8d} deltas")
+
+    # The editor saves single-line HTML: one changed word must not re-store the document
+    html = "".join(
+        f"<p>{i + 1}. " + " ".join(rng.choice(["party", "shall", "notice", "term", "payment"]) for _ in range(40)) + ". The parties agree.</p>"
+        for i in range(CLAUSES * 2)
+    )
+    edited_html = html.replace("shall", "must", 1)
+    html_delta = encode_delta(html, edited_html)
+    html_ok = "\n" not in html and apply_delta(html, html_delta) == edited_html and len(html_delta) < 1024
+    if not html_ok:
+        failures += 1
+
+    print(f"\n   Single-line HTML:         {len(html) / 1024:8.1f} KB")
+    print(f"   One-word edit delta:      {len(html_delta):8d} bytes {'✅' if html_ok else '❌'}")
+
+    print(f"\n❌ {failures} versioning checks failed" if failures else "\n🎉 Every version rebuilt exactly!")
+    return failures == 0
+
+if __name__ == "__main__":
+    test_versioning()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test script for the write-behind queue used for chat history
+Uses a local stand-in table that rejects chosen rows or goes down, so no database is needed
+"""
+
+import os
+import json
+import asyncio
+import tempfile
+
+class ForeignKeyViolation(Exception):
+    """Stand-in for the PostgREST error raised for a row whose document was deleted"""
+    code = "23503"
+
+class StandInTable:
+    """Multi-row insert that fails as a whole if any row is poisoned or the table is down"""
+
+    def __init__(self, poisoned=(), down_after=None):
+        self.poisoned = set(poisoned)
+        self.down_after = down_after
+        self.down = False
+        self.rows = {}
+        self.calls = 0
+
+    async def write(self, rows):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.down or (self.down_after is not None and self.calls > self.down_after):
+            raise ConnectionError("database unavailable")
+        if any(row["id"] in self.poisoned for row in rows):
+            raise ForeignKeyViolation("insert violates foreign key constraint")
+        for row in rows:
+            self.rows[row["id"]] = row
+
+def check(label, condition, failures):
+    print(f"   {'✅' if condition else '❌'} {label}")
+    if not condition:
+        failures.append(label)
+
+def read_rows(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+async def test_write_behind():
+    """Exercise poison rows, outages and the queue cap"""
+    print("🔍 Testing write-behind queue...")
+
+    from utils.write_behind import WriteBehindQueue
+    from utils.database import is_permanent_db_error
+
+    failures = []
+    directory = tempfile.mkdtemp()
+
+    def make_queue(table, **options):
+        return WriteBehindQueue(
+            "test",
+            table.write,
+            flush_interval=60,
+            max_batch=64,
+            is_permanent=is_permanent_db_error,
+            spill_path=os.path.join(directory, "spill.jsonl"),
+            dead_letter_path=os.path.join(directory, "dead_letter.jsonl"),
+            **options
+        )
+
+    # Test 1: A poison row is isolated and the rest of the batch is written
+    print("\n1. Isolating a poison row...")
+    table = StandInTable(poisoned={17})
+    queue = make_queue(table)
+    queue.start()
+    for row_id in range(64):
+        queue.put({"id": row_id})
+    flushed = await queue.flush()
+    dead_letters = read_rows(queue.dead_letter_path)
+    check("Flush succeeded and the queue is empty", flushed and queue.pending() == 0, failures)
+    check("63 good rows written", len(table.rows) == 63 and 17 not in table.rows, failures)
+    check("Poison row moved to the dead-letter file", [row["id"] for row in dead_letters] == [17], failures)
+    check(f"Isolated with {table.calls} writes (not one per row)", table.calls < 20, failures)
+    await queue.close()
+
+    # Test 2: A lone poison row at the head does not block the queue
+    print("\n2. Poison row alone in the queue...")
+    table = StandInTable(poisoned={"head"})
+    queue = make_queue(table)
+    queue.start()
+    queue.put({"id": "head"})
+    await queue.flush()
+    queue.put({"id": "next"})
+    await queue.flush()
+    check("Later rows are written", "next" in table.rows and queue.pending() == 0, failures)
+    await queue.close()
+
+    # Test 3: An outage keeps rows queued without dead-lettering them
+    print("\n3. Database outage...")
+    table = StandInTable()
+    table.down = True
+    queue = make_queue(table)
+    queue.start()
+    for row_id in range(64):
+        queue.put({"id": f"outage-{row_id}"})
+    dead_before = queue.dead_lettered
+    flushed = await queue.flush()
+    check("Flush reported the store unavailable", not flushed and not queue.healthy, failures)
+    check("All rows still queued, none dead-lettered", queue.pending() == 64 and queue.dead_lettered == dead_before, failures)
+    check(f"Gave up after {table.calls} writes", table.calls <= 10, failures)
+    table.down = False
+    check("Rows written once the database is back", await queue.flush() and len(table.rows) == 64, failures)
+    await queue.close()
+
+    # Test 4: An outage partway through a flush loses nothing
+    print("\n4. Outage in the middle of a flush...")
+    # (the poison row splits the batch, then the database goes down after its third write)
+    table = StandInTable(poisoned={40}, down_after=3)
+    queue = make_queue(table)
+    queue.start()
+    for row_id in range(64):
+        queue.put({"id": row_id})
+    dead_before = queue.dead_lettered
+    flushed = await queue.flush()
+    check("Flush reported the store unavailable", not flushed and not queue.healthy, failures)
+    check("Written half left the queue, the rest is still queued", len(table.rows) == 32 and queue.pending() == 32, failures)
+    check("No rows dead-lettered during the outage", queue.dead_lettered == dead_before, failures)
+    check(f"Gave up after {table.calls} writes", table.calls <= 10, failures)
+    table.down_after = None
+    flushed = await queue.flush()
+    check(
+        "Once the database is back the rest is written and only the poison row dead-lettered",
+        flushed and len(table.rows) == 63 and queue.dead_lettered == dead_before + 1,
+        failures
+    )
+    await queue.close()
+
+    # Test 5: The queue is bounded
+    print("\n5. Bounding the queue...")
+    table = StandInTable()
+    queue = make_queue(table, max_pending=10)
+    accepted = [queue.put({"id": row_id}) for row_id in range(12)]
+    check("Rows beyond max_pending are refused", accepted.count(False) == 2 and queue.pending() == 10, failures)
+
+    print(f"\n❌ {len(failures)} write-behind checks failed" if failures else "\n🎉 All write-behind checks passed!")
+    return not failures
+
+if __name__ == "__main__":
+    asyncio.run(test_write_behind())
@@ -0,0 +1,47 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from utils.database import get_document_analysis, save_document_analysis
+from utils.answer_cache import content_version
+
+async def get_or_create_analysis(
+    document: Dict[str, Any],
+    analysis_type: str,
+    prompt_version: str,
+    produce: Callable[[], Awaitable[Any]],
+    text: Optional[str] = None,
+    is_cacheable: Optional[Callable[[Any], bool]] = None
+) -> Tuple[Any, bool]:
+    """Read-through cache for document analyses stored in the document_analyses table.
+
+    Results are keyed by the hash of the analyzed text (the document content
+    unless `text` is given) and the prompt version. Results rejected by
+    `is_cacheable` (e.g. degraded fallbacks) are returned but not stored.
+    Returns the analysis and whether it was served from the cache. Cache
+    failures never fail the request.
+    """
+    content_hash = content_version(text if text is not None else document["content"])
+
+    try:
+        stored = await get_document_analysis(document["id"], analysis_type, content_hash, prompt_version)
+        if stored:
+            return stored["analysis_data"].get("result"), True
+    except Exception as e:
+        print(f"⚠️  Warning: Failed to read cached {analysis_type} analysis for document {document['id']}: {e}")
+
+    result = await produce()
+    if is_cacheable is not None and not is_cacheable(result):
+        return result, False
+
+    try:
+        await save_document_analysis(
+            document_id=document["id"],
+            user_id=document["user_id"],
+            analysis_type=analysis_type,
+            content_hash=content_hash,
+            prompt_version=prompt_version,
+            analysis_data={"result": result}
+        )
+    except Exception as e:
+        print(f"⚠️  Warning: Failed to store {analysis_type} analysis for document {document['id']}: {e}")
+
+    return result, False
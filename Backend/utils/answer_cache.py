@@ -0,0 +1,123 @@
+import os
+import time
+import hashlib
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+# Answer cache configuration
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+ANSWER_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("ANSWER_CACHE_SIMILARITY_THRESHOLD", "0.95"))
+
+def content_version(content: str) -> str:
+    """Return a short, stable version tag for a document's content"""
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()[:16]
+
+class AnswerCache:
+    """In-process semantic cache of RAG answers per document content version.
+
+    Entries are matched by cosine similarity of question embeddings, expire
+    after a TTL and are evicted least-recently-used once the cache is full.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, similarity_threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._by_document: Dict[str, set] = {}
+        self._next_key = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _remove(self, key: int):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_document.get(entry["doc_id"])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_document[entry["doc_id"]]
+
+    def lookup(self, doc_id: str, version: str, query_embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """Return the best cached answer for a semantically equivalent question, if any"""
+        now = time.monotonic()
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query) or 1.0
+
+        best_key, best_score = None, self.similarity_threshold
+        for key in list(self._by_document.get(doc_id, ())):
+            entry = self._entries[key]
+            if entry["version"] != version or now - entry["created_at"] > self.ttl_seconds:
+                self._remove(key)
+                continue
+
+            score = float(np.dot(query, entry["embedding"]) / (query_norm * entry["norm"]))
+            if score >= best_score:
+                best_key, best_score = key, score
+
+        if best_key is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(best_key)
+        entry = self._entries[best_key]
+        return {
+            "question": entry["question"],
+            "answer": entry["answer"],
+            "chunks": entry["chunks"],
+            "similarity": best_score
+        }
+
+    def store(self, doc_id: str, version: str, question: str, query_embedding: List[float], answer: str, chunks: list):
+        """Cache an answer together with the chunks it was grounded on"""
+        embedding = np.asarray(query_embedding, dtype=np.float32)
+        key = self._next_key
+        self._next_key += 1
+
+        self._entries[key] = {
+            "doc_id": doc_id,
+            "version": version,
+            "question": question,
+            "embedding": embedding,
+            "norm": float(np.linalg.norm(embedding)) or 1.0,
+            "answer": answer,
+            "chunks": [
+                {"metadata": dict(chunk.get("metadata") or {}), "score": chunk.get("score", 0)}
+                for chunk in chunks
+            ],
+            "created_at": time.monotonic()
+        }
+        self._by_document.setdefault(doc_id, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+
+    def invalidate_document(self, doc_id: str):
+        """Drop every cached answer for a document"""
+        for key in list(self._by_document.get(doc_id, ())):
+            self._remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit statistics"""
+        return {
+            "entries": len(self._entries),
+            "documents": len(self._by_document),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+# Global answer cache instance
+answer_cache = AnswerCache(
+    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    similarity_threshold=ANSWER_CACHE_SIMILARITY_THRESHOLD
+)
+
+def get_answer_cache() -> AnswerCache:
+    """Get the global answer cache instance"""
+    return answer_cache
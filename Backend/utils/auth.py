@@ -3,17 +3,25 @@ from typing import Optional, Dict, Any
 from fastapi import HTTPException, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from supabase import Client
-from utils.database import get_supabase
+from utils.database import get_supabase, run_db
+from utils.llm_gateway import current_user_id
 
 security = HTTPBearer()
 
+# Emails of users allowed to read process-wide metrics (comma separated)
+METRICS_ADMIN_EMAILS = {
+    email.strip().lower()
+    for email in os.getenv("METRICS_ADMIN_EMAILS", "").split(",")
+    if email.strip()
+}
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
     """Get current authenticated user from Supabase JWT token"""
     try:
         supabase = get_supabase()
         
         # Verify the JWT token with Supabase
-        user = supabase.auth.get_user(credentials.credentials)
+        user = await run_db(supabase.auth.get_user, credentials.credentials)
         
         if not user.user:
             raise HTTPException(status_code=401, detail="Invalid authentication token")
@@ -34,6 +42,19 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
 
 async def get_current_user_id(user: Dict[str, Any] = Depends(get_current_user)) -> str:
     """Extract user ID from authenticated user"""
+    # LLM calls made while handling this request are attributed to the user
+    current_user_id.set(user["id"])
+    return user["id"]
+
+def is_metrics_admin(user: Dict[str, Any]) -> bool:
+    """Whether the user may read metrics covering every user"""
+    return (user.get("email") or "").lower() in METRICS_ADMIN_EMAILS
+
+async def require_metrics_admin(user: Dict[str, Any] = Depends(get_current_user)) -> str:
+    """Allow only users listed in METRICS_ADMIN_EMAILS"""
+    if not is_metrics_admin(user):
+        raise HTTPException(status_code=403, detail="Access denied - metrics are restricted to administrators")
+    current_user_id.set(user["id"])
     return user["id"]
 
 def verify_user_owns_document(user_id: str, document_user_id: str):
@@ -47,7 +68,7 @@ async def create_user_session(email: str, password: str) -> Dict[str, Any]:
         supabase = get_supabase()
         
         # Sign in user
-        auth_response = supabase.auth.sign_in_with_password({
+        auth_response = await run_db(supabase.auth.sign_in_with_password, {
             "email": email,
             "password": password
         })
@@ -81,7 +102,7 @@ async def register_user(email: str, password: str, name: str) -> Dict[str, Any]:
         supabase = get_supabase()
         
         # Sign up user
-        auth_response = supabase.auth.sign_up({
+        auth_response = await run_db(supabase.auth.sign_up, {
             "email": email,
             "password": password,
             "options": {
@@ -116,7 +137,7 @@ async def refresh_user_session(refresh_token: str) -> Dict[str, Any]:
         supabase = get_supabase()
         
         # Refresh session
-        session = supabase.auth.refresh_session(refresh_token)
+        session = await run_db(supabase.auth.refresh_session, refresh_token)
         
         if not session.session:
             raise HTTPException(status_code=401, detail="Token refresh failed")
@@ -134,7 +155,7 @@ async def logout_user():
     """Logout user from Supabase Auth"""
     try:
         supabase = get_supabase()
-        supabase.auth.sign_out()
+        await run_db(supabase.auth.sign_out)
         return {"message": "Logout successful"}
     except Exception as e:
         raise HTTPException(status_code=400, detail="Logout failed")
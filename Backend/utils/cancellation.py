@@ -0,0 +1,54 @@
+import asyncio
+from typing import Any, Awaitable, Dict, Hashable
+
+from fastapi import Request
+
+class Superseded(Exception):
+    """Raised when a newer request for the same session replaced this one"""
+
+class ClientDisconnected(Exception):
+    """Raised when the client went away before the result was ready"""
+
+class LatestOnly:
+    """Keeps only the newest task per key; starting a new one cancels the previous.
+
+    Used for keystroke-driven calls such as auto-complete, where only the
+    latest request of an editor session is still wanted.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    def start(self, key: Hashable, work: Awaitable[Any]) -> asyncio.Task:
+        """Run `work` as the latest task for `key`, cancelling the previous one"""
+        previous = self._tasks.get(key)
+        if previous is not None and not previous.done():
+            previous.cancel()
+
+        task = asyncio.ensure_future(work)
+        self._tasks[key] = task
+
+        def forget(_, key=key, task=task):
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+        task.add_done_callback(forget)
+        return task
+
+    async def wait(self, request: Request, task: asyncio.Task, poll_interval: float = 0.1) -> Any:
+        """Wait for a task, cancelling it if the client disconnects or a newer request supersedes it"""
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=poll_interval)
+                if done:
+                    break
+                if await request.is_disconnected():
+                    task.cancel()
+                    raise ClientDisconnected()
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+
+        if task.cancelled():
+            raise Superseded()
+        return task.result()
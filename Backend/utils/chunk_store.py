@@ -0,0 +1,102 @@
+import os
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterable, Tuple
+
+from utils.answer_cache import content_version
+
+# Number of document versions whose chunk layout is kept in memory
+CHUNK_STORE_MAX_DOCUMENTS = int(os.getenv("CHUNK_STORE_MAX_DOCUMENTS", "500"))
+
+# Global chunk layout store: (doc_id, content version) -> chunks ordered by chunk_index.
+# Keying on the content version means a layout is only ever used for the text it
+# was cut from, even when another worker edited the document or re-indexing failed.
+_chunk_layouts: "OrderedDict[Tuple[str, str], List[Dict[str, Any]]]" = OrderedDict()
+
+def put_document_chunks(doc_id: str, version: str, chunks: List[Dict[str, Any]]):
+    """Record the ordered chunks (index, text, start, end) of a document's content version"""
+    key = (doc_id, version)
+    _chunk_layouts[key] = sorted(chunks, key=lambda chunk: chunk["index"])
+    _chunk_layouts.move_to_end(key)
+
+    while len(_chunk_layouts) > CHUNK_STORE_MAX_DOCUMENTS:
+        _chunk_layouts.popitem(last=False)
+
+def get_document_chunks(doc_id: str, version: str) -> List[Dict[str, Any]]:
+    """Get the recorded chunks of a document's content version, or an empty list if unknown"""
+    key = (doc_id, version)
+    chunks = _chunk_layouts.get(key)
+    if chunks is None:
+        return []
+    _chunk_layouts.move_to_end(key)
+    return chunks
+
+def drop_document_chunks(doc_id: str):
+    """Forget the chunk layouts of every version of a document"""
+    for key in [key for key in _chunk_layouts if key[0] == doc_id]:
+        del _chunk_layouts[key]
+
+def ensure_document_chunks(doc_id: str, content: str) -> List[Dict[str, Any]]:
+    """Get the chunk layout of this content of a document, building it if it is not cached.
+
+    Chunking is deterministic, so the rebuilt layout matches the chunk indices
+    stored in Pinecone for the same content.
+    """
+    version = content_version(content)
+    chunks = get_document_chunks(doc_id, version)
+    if chunks:
+        return chunks
+
+    from utils.vector_store import chunk_text_with_offsets
+    put_document_chunks(doc_id, version, chunk_text_with_offsets(content or ""))
+    return get_document_chunks(doc_id, version)
+
+def merge_windows(hit_indices: Iterable[int], window: int, chunk_count: int) -> List[List[int]]:
+    """Merge [hit - window, hit + window] ranges into sorted, non-overlapping [first, last] ranges"""
+    ranges = sorted(
+        (max(0, index - window), min(chunk_count - 1, index + window))
+        for index in set(hit_indices)
+        if 0 <= index < chunk_count
+    )
+
+    merged: List[List[int]] = []
+    for first, last in ranges:
+        # Chunks are contiguous, so touching ranges are merged as well
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return merged
+
+def join_chunks(chunks: List[Dict[str, Any]]) -> str:
+    """Join consecutive chunks into one text without repeating their overlaps"""
+    if not chunks:
+        return ""
+
+    text = chunks[0]["text"]
+    end = chunks[0]["end"]
+    for chunk in chunks[1:]:
+        if chunk["start"] <= end:
+            text += chunk["text"][end - chunk["start"]:]
+        else:
+            text += "\n" + chunk["text"]
+        end = max(end, chunk["end"])
+    return text
+
+def expand_hits(chunks: List[Dict[str, Any]], hit_indices: Iterable[int], window: int = 1) -> List[Dict[str, Any]]:
+    """Expand retrieved chunk indices to merged neighbor spans using a chunk layout"""
+    if not chunks:
+        return []
+
+    hit_set = set(hit_indices)
+    spans = []
+    for first, last in merge_windows(hit_set, window, len(chunks)):
+        span_chunks = chunks[first:last + 1]
+        spans.append({
+            "first_chunk": first,
+            "last_chunk": last,
+            "start": span_chunks[0]["start"],
+            "end": span_chunks[-1]["end"],
+            "hit_chunks": sorted(index for index in hit_set if first <= index <= last),
+            "text": join_chunks(span_chunks)
+        })
+    return spans
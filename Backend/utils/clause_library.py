@@ -0,0 +1,304 @@
+import re
+import asyncio
+from string import Formatter
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+class Clause:
+    """A standard clause with `{parameter}` placeholders, or a bespoke section the LLM writes"""
+
+    def __init__(self, title: str, text: str = "", instruction: Optional[str] = None):
+        self.title = title
+        self.text = text
+        self.instruction = instruction
+
+    @property
+    def bespoke(self) -> bool:
+        return self.instruction is not None
+
+class _Blanks(dict):
+    """Leave a visible blank for parameters the request did not provide"""
+
+    def __missing__(self, key: str) -> str:
+        return f"[{key.replace('_', ' ').title()}]"
+
+_COMMON_CLAUSES = {
+    "governing_law": Clause(
+        "Governing Law",
+        "This Agreement shall be governed by and construed in accordance with the laws of {governing_law}, "
+        "without regard to its conflict of laws principles. The courts of {governing_law} shall have exclusive "
+        "jurisdiction over any dispute arising out of or in connection with this Agreement."
+    ),
+    "entire_agreement": Clause(
+        "Entire Agreement",
+        "This Agreement constitutes the entire agreement between the parties with respect to its subject matter "
+        "and supersedes all prior negotiations, representations and agreements, whether written or oral."
+    ),
+    "amendment": Clause(
+        "Amendment and Waiver",
+        "No amendment to this Agreement is effective unless it is in writing and signed by both parties. "
+        "No failure or delay in exercising any right operates as a waiver of that right."
+    ),
+    "severability": Clause(
+        "Severability",
+        "If any provision of this Agreement is held invalid or unenforceable, the remaining provisions shall "
+        "continue in full force and effect, and the invalid provision shall be replaced by a valid provision "
+        "that most closely reflects the parties' original intent."
+    ),
+    "notices": Clause(
+        "Notices",
+        "All notices under this Agreement shall be in writing and delivered by hand, by registered mail or by "
+        "email to the addresses the parties designate in writing, and are effective upon receipt."
+    ),
+    "counterparts": Clause(
+        "Counterparts",
+        "This Agreement may be executed in counterparts, including by electronic signature, each of which is "
+        "an original and all of which together constitute one instrument."
+    ),
+}
+
+_BOILERPLATE = ["governing_law", "entire_agreement", "amendment", "severability", "notices", "counterparts"]
+
+# Indexed standard clauses per document type; bespoke sections are written by the LLM
+CLAUSE_LIBRARY: Dict[str, Dict[str, Any]] = {
+    "nda": {
+        "title": "Mutual Non-Disclosure Agreement",
+        "defaults": {},
+        "bespoke_details": {"purpose", "confidential_information", "information", "categories", "project"},
+        "preamble": (
+            "This Mutual Non-Disclosure Agreement (the \"Agreement\") is entered into as of {effective_date} "
+            "by and between {party_a} and {party_b} (each a \"Party\" and together the \"Parties\")."
+        ),
+        "clauses": [
+            Clause("Purpose", instruction="State the purpose for which the Parties will exchange confidential information, based on the details."),
+            Clause("Definition of Confidential Information", instruction="Define Confidential Information for this specific relationship, listing the categories of information the details imply."),
+            Clause(
+                "Obligations of the Receiving Party",
+                "The receiving Party shall hold the disclosing Party's Confidential Information in strict confidence, "
+                "use it solely for the Purpose, and disclose it only to its employees and advisers who need to know it "
+                "and are bound by confidentiality obligations no less protective than this Agreement."
+            ),
+            Clause(
+                "Exclusions",
+                "Confidential Information does not include information that (a) is or becomes publicly available "
+                "through no fault of the receiving Party, (b) was lawfully known to the receiving Party before disclosure, "
+                "(c) is lawfully received from a third party without restriction, or (d) is independently developed "
+                "without use of the disclosing Party's Confidential Information."
+            ),
+            Clause(
+                "Term",
+                "This Agreement remains in effect for {term} from the date above. The confidentiality obligations "
+                "survive for {confidentiality_period} after its expiry or termination."
+            ),
+            Clause(
+                "Return of Information",
+                "Upon request or termination, the receiving Party shall promptly return or destroy all Confidential "
+                "Information of the disclosing Party and certify the destruction in writing."
+            ),
+            *[_COMMON_CLAUSES[name] for name in _BOILERPLATE],
+        ],
+    },
+    "service_agreement": {
+        "title": "Service Agreement",
+        "defaults": {"cure_period": "thirty days", "liability_cap_period": "twelve months"},
+        "bespoke_details": {
+            "services", "scope", "scope_of_services", "deliverables", "milestones",
+            "fees", "fee", "rate", "price", "payment", "payment_terms", "invoicing"
+        },
+        "preamble": (
+            "This Service Agreement (the \"Agreement\") is entered into as of {effective_date} by and between "
+            "{client} (the \"Client\") and {service_provider} (the \"Service Provider\")."
+        ),
+        "clauses": [
+            Clause("Scope of Services", instruction="Describe the services the Service Provider will perform, with deliverables and milestones drawn from the details."),
+            Clause("Fees and Payment", instruction="Set out the fees, invoicing schedule and payment terms given in the details."),
+            Clause(
+                "Term and Termination",
+                "This Agreement commences on {effective_date} and continues for {term} unless terminated earlier. "
+                "Either party may terminate this Agreement on {notice_period} written notice, or immediately if the "
+                "other party materially breaches it and fails to cure the breach within {cure_period} of notice."
+            ),
+            Clause(
+                "Independent Contractor",
+                "The Service Provider is an independent contractor. Nothing in this Agreement creates an employment, "
+                "partnership or agency relationship between the parties."
+            ),
+            Clause(
+                "Confidentiality",
+                "Each party shall keep the other party's non-public information confidential and use it only to "
+                "perform this Agreement."
+            ),
+            Clause(
+                "Limitation of Liability",
+                "Except for breaches of confidentiality or amounts owed, neither party is liable for indirect or "
+                "consequential damages, and each party's total liability is limited to the fees paid under this "
+                "Agreement in the {liability_cap_period} preceding the claim."
+            ),
+            *[_COMMON_CLAUSES[name] for name in _BOILERPLATE],
+        ],
+    },
+    "employment_agreement": {
+        "title": "Employment Agreement",
+        "defaults": {"probation_notice_period": "one week's"},
+        "bespoke_details": {
+            "position", "title", "job_title", "role", "duties", "reporting_to", "manager", "place_of_work", "location",
+            "salary", "compensation", "pay", "payment_frequency", "bonus", "bonuses", "benefits"
+        },
+        "preamble": (
+            "This Employment Agreement (the \"Agreement\") is entered into as of {effective_date} by and between "
+            "{employer} (the \"Employer\") and {employee} (the \"Employee\")."
+        ),
+        "clauses": [
+            Clause("Position and Duties", instruction="Describe the Employee's position, reporting line, duties and place of work from the details."),
+            Clause("Compensation and Benefits", instruction="Set out salary, payment frequency, bonuses and benefits given in the details."),
+            Clause(
+                "Commencement and Probation",
+                "Employment commences on {start_date}. The first {probation_period} of employment is a probationary "
+                "period during which either party may terminate employment on {probation_notice_period} notice."
+            ),
+            Clause(
+                "Working Hours and Leave",
+                "The Employee's normal working hours are {working_hours}. The Employee is entitled to {annual_leave} "
+                "of paid annual leave per year in addition to public holidays."
+            ),
+            Clause(
+                "Confidentiality",
+                "During and after employment, the Employee shall not disclose or use the Employer's confidential "
+                "information except as required to perform the Employee's duties."
+            ),
+            Clause(
+                "Intellectual Property",
+                "All work product created by the Employee in the course of employment belongs to the Employer."
+            ),
+            Clause(
+                "Termination",
+                "After the probationary period, either party may terminate employment by giving {notice_period} "
+                "written notice. The Employer may terminate employment without notice for gross misconduct."
+            ),
+            *[_COMMON_CLAUSES[name] for name in _BOILERPLATE],
+        ],
+    },
+}
+
+# Names users give document types, mapped onto library keys
+DOC_TYPE_ALIASES = {
+    "nda": "nda",
+    "non_disclosure_agreement": "nda",
+    "mutual_non_disclosure_agreement": "nda",
+    "confidentiality_agreement": "nda",
+    "service_agreement": "service_agreement",
+    "services_agreement": "service_agreement",
+    "consulting_agreement": "service_agreement",
+    "master_services_agreement": "service_agreement",
+    "employment_agreement": "employment_agreement",
+    "employment_contract": "employment_agreement",
+    "offer_of_employment": "employment_agreement",
+}
+
+# Names users give details, mapped onto placeholder names
+PARAMETER_ALIASES = {
+    "jurisdiction": "governing_law",
+    "law": "governing_law",
+    "date": "effective_date",
+    "start": "start_date",
+    "duration": "term",
+    "notice": "notice_period",
+    "probation": "probation_period",
+    "cure": "cure_period",
+    "liability_cap": "liability_cap_period",
+}
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", str(value).lower()).strip("_")
+
+def lookup_doc_type(doc_type: str) -> Optional[str]:
+    """Return the clause library key for a document type, or None if it is not in the library"""
+    return DOC_TYPE_ALIASES.get(_slug(doc_type))
+
+def _placeholders(entry: Dict[str, Any]) -> Set[str]:
+    texts = [entry["preamble"]] + [clause.text for clause in entry["clauses"] if not clause.bespoke]
+    return {name for text in texts for _, name, _, _ in Formatter().parse(text) if name}
+
+def clause_parameters(details: Dict[str, Any], defaults: Optional[Dict[str, str]] = None) -> _Blanks:
+    """Normalize request details into placeholder values (keys lower_snake_case, aliases resolved)"""
+    params = _Blanks(defaults or {})
+    for key, value in (details or {}).items():
+        if value not in (None, ""):
+            slug = _slug(key)
+            params[PARAMETER_ALIASES.get(slug, slug)] = str(value)
+    return params
+
+def library_document(doc_type: str, details: Dict[str, Any]) -> Optional[str]:
+    """Return the clause library key if the library can honor every detail, or None.
+
+    A library document is only used when every placeholder of its standard
+    clauses has a value and every detail either fills a placeholder or is
+    consumed by a bespoke section; anything else (a one-way NDA, a term the
+    standard text does not expose) needs full generation so it is not dropped.
+    """
+    key = lookup_doc_type(doc_type)
+    if key is None:
+        return None
+
+    entry = CLAUSE_LIBRARY[key]
+    placeholders = _placeholders(entry)
+    params = clause_parameters(details, entry["defaults"])
+    missing = placeholders - set(params)
+    unmapped = {
+        name for name in clause_parameters(details)
+        if name not in placeholders and name not in entry["bespoke_details"]
+    }
+    if missing or unmapped:
+        print(f"📄 Generating {doc_type} in full (missing: {sorted(missing)}, unmapped details: {sorted(unmapped)})")
+        return None
+    return key
+
+async def iter_document_sections(
+    doc_type: str,
+    details: Dict[str, Any],
+    write_section: Callable[[str, str, str], Awaitable[str]],
+    max_concurrency: int = 4
+) -> AsyncIterator[str]:
+    """Yield a library document's parts in order.
+
+    Standard clauses are filled in locally; bespoke sections are written by
+    `write_section(title, instruction, details)` concurrently, starting
+    immediately, and yielded in document order as they become available.
+    """
+    entry = CLAUSE_LIBRARY[lookup_doc_type(doc_type)]
+    params = clause_parameters(details, entry["defaults"])
+    details_text = "\n".join(f"- {key}: {value}" for key, value in (details or {}).items()) or "- (none provided)"
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def write(clause: Clause) -> str:
+        async with semaphore:
+            return (await write_section(clause.title, clause.instruction, details_text)).strip()
+
+    bespoke = {
+        position: asyncio.create_task(write(clause))
+        for position, clause in enumerate(entry["clauses"])
+        if clause.bespoke
+    }
+
+    try:
+        yield f"{entry['title'].upper()}\n\n{entry['preamble'].format_map(params)}\n\n"
+        for position, clause in enumerate(entry["clauses"]):
+            body = await bespoke[position] if clause.bespoke else clause.text.format_map(params)
+            yield f"{position + 1}. {clause.title.upper()}\n\n{body}\n\n"
+
+        yield (
+            "IN WITNESS WHEREOF, the parties have executed this Agreement as of the date first written above.\n\n"
+            "______________________________\nName:\nTitle:\nDate:\n\n"
+            "______________________________\nName:\nTitle:\nDate:\n"
+        )
+    finally:
+        for task in bespoke.values():
+            task.cancel()
+
+async def assemble_document(
+    doc_type: str,
+    details: Dict[str, Any],
+    write_section: Callable[[str, str, str], Awaitable[str]],
+    max_concurrency: int = 4
+) -> str:
+    """Assemble a complete library document"""
+    return "".join([part async for part in iter_document_sections(doc_type, details, write_section, max_concurrency)])
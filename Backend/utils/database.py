@@ -1,14 +1,34 @@
 import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from supabase import create_client, Client
-from typing import Optional
+from typing import Optional, Callable, Any
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 import mimetypes
 import re
+import json
+import time
+import base64
+
+from utils.answer_cache import get_answer_cache, content_version
+from utils.lru_cache import LRUCache
+from utils.write_behind import WriteBehindQueue
+from utils.versioning import encode_delta, apply_delta
 
 # Global Supabase client
 supabase: Optional[Client] = None
 
+# The Supabase client is synchronous; its calls run on this bounded pool so they never block the event loop
+SUPABASE_MAX_WORKERS = int(os.getenv("SUPABASE_MAX_WORKERS", "16"))
+_db_executor = ThreadPoolExecutor(max_workers=SUPABASE_MAX_WORKERS, thread_name_prefix="supabase")
+
+async def run_db(call: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking Supabase (database, storage or auth) call on the database thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, functools.partial(call, *args, **kwargs))
+
 async def init_supabase():
     """Initialize Supabase client"""
     global supabase
@@ -27,14 +47,18 @@ def get_supabase() -> Client:
         raise RuntimeError("Supabase client not initialized. Call init_supabase() first.")
     return supabase
 
+def read_file_bytes(file_path: str) -> bytes:
+    """Read a local file"""
+    with open(file_path, 'rb') as f:
+        return f.read()
+
 async def upload_file_to_bucket(file_path: str, file_name: str, user_id: str, bucket_name: str = "documents") -> str:
     """Upload file to Supabase Storage bucket"""
     client = get_supabase()
     
     try:
         # Read file content
-        with open(file_path, 'rb') as f:
-            file_content = f.read()
+        file_content = await asyncio.to_thread(read_file_bytes, file_path)
         
         # Generate unique file path in bucket
         unique_filename = f"{user_id}/{uuid.uuid4()}_{file_name}"
@@ -49,7 +73,8 @@ async def upload_file_to_bucket(file_path: str, file_name: str, user_id: str, bu
         content_type = mime_map.get(ext) or mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
         
         # Upload to Supabase Storage
-        result = client.storage.from_(bucket_name).upload(
+        result = await run_db(
+            client.storage.from_(bucket_name).upload,
             path=unique_filename,
             file=file_content,
             file_options={"content-type": content_type}
@@ -80,7 +105,7 @@ async def delete_file_from_bucket(file_url: str, bucket_name: str = "documents")
             raise Exception(f"Bucket name mismatch: expected '{bucket_name}', got '{bucket_from_url}' in URL: {file_url}")
         print(f"[Supabase Delete][DEBUG] Attempting to delete file: bucket={bucket_name}, path={file_path}")
         # Delete file
-        result = client.storage.from_(bucket_name).remove([file_path])
+        result = await run_db(client.storage.from_(bucket_name).remove, [file_path])
         print(f"[Supabase Delete][DEBUG] Remove result: {result}")
         # Check result for errors (if the client returns any)
         if hasattr(result, 'error') and result.error:
@@ -105,34 +130,161 @@ async def create_document(user_id: str, title: str, content: str, file_url: Opti
         "updated_at": "now()"
     }
     
-    result = client.table("documents").insert(data).execute()
-    return result.data[0] if result.data else None
+    result = await run_db(client.table("documents").insert(data).execute)
+    document = result.data[0] if result.data else None
+    
+    if document:
+        try:
+            await record_document_version(document["id"], user_id, title, content)
+        except Exception as e:
+            print(f"⚠️  Warning: Failed to record the first version of document {document['id']}: {e}")
+    
+    return document
+
+# Per-process document cache: doc_id -> (document, fetched_at). Entries younger than
+# DOCUMENT_CACHE_FRESH_SECONDS are served as is; older ones are revalidated against
+# updated_at with a metadata-only query, so content is only re-read when it changed.
+# Entries are dropped after DOCUMENT_CACHE_TTL_SECONDS or when this process updates or deletes the document.
+DOCUMENT_CACHE_SIZE = int(os.getenv("DOCUMENT_CACHE_SIZE", "256"))
+DOCUMENT_CACHE_FRESH_SECONDS = float(os.getenv("DOCUMENT_CACHE_FRESH_SECONDS", "5"))
+DOCUMENT_CACHE_TTL_SECONDS = float(os.getenv("DOCUMENT_CACHE_TTL_SECONDS", "600"))
+document_cache = LRUCache(max_entries=DOCUMENT_CACHE_SIZE, ttl_seconds=DOCUMENT_CACHE_TTL_SECONDS)
+
+# Columns needed to check ownership; never includes content
+DOCUMENT_OWNER_COLUMNS = "id, user_id, title, updated_at"
 
-async def get_document(doc_id: str):
-    """Get a document by ID"""
+def invalidate_cached_document(doc_id: str):
+    """Drop a document from this process's document cache"""
+    document_cache.pop(doc_id)
+
+async def get_document_owner(doc_id: str):
+    """Get a document's id, owner, title and updated_at without loading its content"""
+    cached = document_cache.get(doc_id)
+    if cached is not None and time.monotonic() - cached[1] <= DOCUMENT_CACHE_FRESH_SECONDS:
+        return {column: cached[0].get(column) for column in ("id", "user_id", "title", "updated_at")}
+    
     client = get_supabase()
-    result = client.table("documents").select("*").eq("id", doc_id).execute()
+    result = await run_db(client.table("documents").select(DOCUMENT_OWNER_COLUMNS).eq("id", doc_id).execute)
     return result.data[0] if result.data else None
 
-async def get_user_documents(user_id: str):
-    """Get all documents for a user"""
+async def get_document(doc_id: str, fresh: bool = False):
+    """Get a document by ID, served from the document cache while it is unchanged.
+    
+    Pass `fresh=True` for read-modify-write updates: the cache may be up to
+    DOCUMENT_CACHE_FRESH_SECONDS behind another worker's save.
+    """
+    cached = None if fresh else document_cache.get(doc_id)
+    if cached is not None:
+        document, fetched_at = cached
+        if time.monotonic() - fetched_at <= DOCUMENT_CACHE_FRESH_SECONDS:
+            return dict(document)
+        
+        # Revalidate: only reload the full row if updated_at moved
+        owner = await get_document_owner(doc_id)
+        if owner is None:
+            invalidate_cached_document(doc_id)
+            return None
+        if owner["updated_at"] == document.get("updated_at"):
+            document = {**document, **owner}
+            document_cache.set(doc_id, (document, time.monotonic()))
+            return dict(document)
+    
     client = get_supabase()
-    result = client.table("documents").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
-    return result.data
+    result = await run_db(client.table("documents").select("*").eq("id", doc_id).execute)
+    if not result.data:
+        invalidate_cached_document(doc_id)
+        return None
+    
+    document = result.data[0]
+    document_cache.set(doc_id, (document, time.monotonic()))
+    return dict(document)
+
+def encode_cursor(row: dict) -> str:
+    """Encode the (created_at, id) position of a row as an opaque pagination cursor"""
+    position = json.dumps({"created_at": row["created_at"], "id": row["id"]})
+    return base64.urlsafe_b64encode(position.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a pagination cursor, raising ValueError if it is malformed"""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return {"created_at": str(position["created_at"]), "id": str(position["id"])}
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def after_cursor(query, cursor: Optional[str]):
+    """Restrict a query ordered by (created_at, id) descending to rows after the cursor"""
+    if not cursor:
+        return query
+    position = decode_cursor(cursor)
+    created_at, row_id = position["created_at"], position["id"]
+    return query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{row_id}")')
+
+def paginate(rows: list, limit: int) -> tuple:
+    """Split a limit + 1 result into the page and the cursor of the next page"""
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(rows) > limit else None
+    return page, next_cursor
+
+# Columns returned when listing documents; full content is only fetched by get_document
+DOCUMENT_LIST_COLUMNS = "id, title, file_name, file_size, file_type, created_at, updated_at"
+
+async def get_user_documents(user_id: str, limit: int = 50, cursor: Optional[str] = None):
+    """Get a page of a user's documents (listing columns only), newest first.
+    
+    Returns the documents and the cursor of the next page, or None on the last page.
+    """
+    client = get_supabase()
+    query = client.table("documents").select(DOCUMENT_LIST_COLUMNS).eq("user_id", user_id)
+    query = after_cursor(query, cursor).order("created_at", desc=True).order("id", desc=True).limit(limit + 1)
+    result = await run_db(query.execute)
+    return paginate(result.data, limit)
 
-async def update_document(doc_id: str, content: str, title: Optional[str] = None):
-    """Update document content"""
+async def update_document(doc_id: str, content: Optional[str] = None, title: Optional[str] = None):
+    """Update document content and/or title and record the change in its version history.
+    
+    Content is only written when given, so a title-only update cannot overwrite
+    a newer save with an older copy of the content.
+    """
     client = get_supabase()
+    previous = await get_document(doc_id, fresh=True)
     
     update_data = {
-        "content": content,
         "updated_at": "now()"
     }
     
+    if content is not None:
+        update_data["content"] = content
+    
     if title:
         update_data["title"] = title
     
-    result = client.table("documents").update(update_data).eq("id", doc_id).execute()
+    result = await run_db(client.table("documents").update(update_data).eq("id", doc_id).execute)
+    invalidate_cached_document(doc_id)
+    
+    if result.data and previous:
+        try:
+            await record_document_version(
+                doc_id,
+                previous["user_id"],
+                title or previous["title"],
+                content if content is not None else previous["content"],
+                previous_content=previous["content"],
+                previous_title=previous["title"]
+            )
+        except Exception as e:
+            print(f"⚠️  Warning: Failed to record a version of document {doc_id}: {e}")
+    
+    if content is None:
+        return result.data[0] if result.data else None
+    
+    # Cached answers and analyses were produced from the previous content
+    get_answer_cache().invalidate_document(doc_id)
+    try:
+        await delete_document_analyses(doc_id, keep_content_hash=content_version(content))
+    except Exception as e:
+        print(f"⚠️  Warning: Failed to clear stored analyses for document {doc_id}: {e}")
+    
     return result.data[0] if result.data else None
 
 async def delete_document(doc_id: str):
@@ -144,9 +296,141 @@ async def delete_document(doc_id: str):
     if doc and doc.get("file_url"):
         await delete_file_from_bucket(doc["file_url"])
     
-    result = client.table("documents").delete().eq("id", doc_id).execute()
+    result = await run_db(client.table("documents").delete().eq("id", doc_id).execute)
+    invalidate_cached_document(doc_id)
+    get_answer_cache().invalidate_document(doc_id)
+    return result.data[0] if result.data else None
+
+# Versions are stored as compressed deltas against the previous version, with a full
+# snapshot every VERSION_SNAPSHOT_INTERVAL versions so any version is rebuilt from at
+# most that many deltas. A snapshot is also written when a delta would not save much.
+VERSION_SNAPSHOT_INTERVAL = int(os.getenv("VERSION_SNAPSHOT_INTERVAL", "20"))
+VERSION_SNAPSHOT_RATIO = float(os.getenv("VERSION_SNAPSHOT_RATIO", "0.5"))
+
+# Columns returned when listing versions; content is only rebuilt by get_document_version
+DOCUMENT_VERSION_LIST_COLUMNS = "id, version_number, kind, title, size_bytes, content_hash, created_at"
+
+# Versions never change, so rebuilt contents are kept per process
+document_version_cache = LRUCache(max_entries=int(os.getenv("DOCUMENT_VERSION_CACHE_SIZE", "128")))
+
+async def record_document_version(
+    doc_id: str,
+    user_id: str,
+    title: str,
+    content: str,
+    previous_content: Optional[str] = None,
+    previous_title: Optional[str] = None
+):
+    """Append a version for a document's new content.
+    
+    The version is a delta against the latest version when that version's content
+    hash matches `previous_content`; otherwise (no history yet, or a history that
+    missed a change) it is a full snapshot.
+    """
+    if previous_content == content and previous_title == title:
+        return None
+    
+    client = get_supabase()
+    latest = await run_db(
+        client.table("document_versions")
+        .select("version_number, content_hash")
+        .eq("document_id", doc_id)
+        .order("version_number", desc=True)
+        .limit(1)
+        .execute
+    )
+    latest = latest.data[0] if latest.data else None
+    version_number = latest["version_number"] + 1 if latest else 1
+    
+    data = {
+        "document_id": doc_id,
+        "user_id": user_id,
+        "version_number": version_number,
+        "title": title,
+        "content_hash": content_version(content)
+    }
+    
+    delta = None
+    chains_from_latest = (
+        latest is not None
+        and previous_content is not None
+        and latest.get("content_hash") == content_version(previous_content)
+    )
+    if chains_from_latest and (version_number - 1) % VERSION_SNAPSHOT_INTERVAL != 0:
+        delta = encode_delta(previous_content, content)
+        if len(delta) > len(content.encode("utf-8")) * VERSION_SNAPSHOT_RATIO:
+            delta = None
+    
+    if delta is not None:
+        data.update({"kind": "delta", "base_version": version_number - 1, "delta": delta, "size_bytes": len(delta)})
+    else:
+        data.update({"kind": "snapshot", "content": content, "size_bytes": len(content.encode("utf-8"))})
+    
+    result = await run_db(client.table("document_versions").insert(data).execute)
     return result.data[0] if result.data else None
 
+async def get_document_versions(doc_id: str, limit: int = 50, cursor: Optional[str] = None):
+    """Get a page of a document's versions (metadata only), newest first.
+    
+    Returns the versions and the cursor of the next page, or None on the last page.
+    """
+    client = get_supabase()
+    query = client.table("document_versions").select(DOCUMENT_VERSION_LIST_COLUMNS).eq("document_id", doc_id)
+    query = after_cursor(query, cursor).order("created_at", desc=True).order("id", desc=True).limit(limit + 1)
+    result = await run_db(query.execute)
+    return paginate(result.data, limit)
+
+async def get_document_version(doc_id: str, version_number: int):
+    """Rebuild a version of a document from its nearest snapshot and the deltas after it"""
+    cached = document_version_cache.get((doc_id, version_number))
+    if cached is not None:
+        return dict(cached)
+    
+    client = get_supabase()
+    snapshot = await run_db(
+        client.table("document_versions")
+        .select("version_number, kind, title, content, created_at")
+        .eq("document_id", doc_id)
+        .eq("kind", "snapshot")
+        .lte("version_number", version_number)
+        .order("version_number", desc=True)
+        .limit(1)
+        .execute
+    )
+    if not snapshot.data:
+        return None
+    
+    row = snapshot.data[0]
+    deltas = await run_db(
+        client.table("document_versions")
+        .select("version_number, kind, title, delta, created_at")
+        .eq("document_id", doc_id)
+        .gt("version_number", row["version_number"])
+        .lte("version_number", version_number)
+        .order("version_number")
+        .execute
+    )
+    
+    content = row["content"]
+    for delta_row in deltas.data:
+        if delta_row["version_number"] != row["version_number"] + 1 or delta_row["kind"] != "delta":
+            raise ValueError(f"Version history of document {doc_id} is broken at version {delta_row['version_number']}")
+        content = apply_delta(content, delta_row["delta"])
+        row = delta_row
+    
+    if row["version_number"] != version_number:
+        return None
+    
+    version = {
+        "version_number": version_number,
+        "kind": row["kind"],
+        "title": row["title"],
+        "content": content,
+        "created_at": row["created_at"]
+    }
+    document_version_cache.set((doc_id, version_number), version)
+    return dict(version)
+
 async def create_user_profile(user_id: str, email: str, name: str):
     """Create or update user profile"""
     client = get_supabase()
@@ -160,39 +444,126 @@ async def create_user_profile(user_id: str, email: str, name: str):
     }
     
     # Use upsert to handle both insert and update
-    result = client.table("profiles").upsert(data).execute()
+    result = await run_db(client.table("profiles").upsert(data).execute)
     return result.data[0] if result.data else None
 
 async def get_user_profile(user_id: str):
     """Get user profile"""
     client = get_supabase()
-    result = client.table("profiles").select("*").eq("id", user_id).execute()
+    result = await run_db(client.table("profiles").select("*").eq("id", user_id).execute)
+    return result.data[0] if result.data else None
+
+async def get_document_analysis(document_id: str, analysis_type: str, content_hash: str, prompt_version: str):
+    """Get a stored analysis for a document's content and prompt version"""
+    client = get_supabase()
+    query = (
+        client.table("document_analyses")
+        .select("analysis_data, created_at")
+        .eq("document_id", document_id)
+        .eq("analysis_type", analysis_type)
+        .eq("content_hash", content_hash)
+        .eq("prompt_version", prompt_version)
+        .limit(1)
+    )
+    result = await run_db(query.execute)
+    return result.data[0] if result.data else None
+
+async def save_document_analysis(document_id: str, user_id: str, analysis_type: str, content_hash: str, prompt_version: str, analysis_data: dict):
+    """Store an analysis result for a document's content and prompt version"""
+    client = get_supabase()
+    
+    data = {
+        "document_id": document_id,
+        "user_id": user_id,
+        "analysis_type": analysis_type,
+        "content_hash": content_hash,
+        "prompt_version": prompt_version,
+        "analysis_data": analysis_data,
+        "created_at": "now()"
+    }
+    
+    query = client.table("document_analyses").upsert(data, on_conflict="document_id,analysis_type,content_hash,prompt_version")
+    result = await run_db(query.execute)
     return result.data[0] if result.data else None
 
-async def get_chat_history(user_id: str, document_id: str = None):
-    """Get chat history for a user and optionally a specific document"""
+async def delete_document_analyses(document_id: str, keep_content_hash: Optional[str] = None):
+    """Delete stored analyses for a document, optionally keeping those for the current content"""
     client = get_supabase()
     
-    query = client.table("chat_history").select("*").eq("user_id", user_id)
+    query = client.table("document_analyses").delete().eq("document_id", document_id)
+    if keep_content_hash:
+        query = query.neq("content_hash", keep_content_hash)
+    
+    result = await run_db(query.execute)
+    return result.data
+
+# Columns returned when listing chat history; sources are only included on request
+CHAT_HISTORY_COLUMNS = "id, document_id, question, answer, created_at"
+
+async def get_chat_history(user_id: str, document_id: str = None, limit: int = 50, cursor: Optional[str] = None, include_sources: bool = False):
+    """Get a page of chat history for a user and optionally a specific document, newest first.
+    
+    Returns the entries and the cursor of the next (older) page, or None on the last page.
+    """
+    client = get_supabase()
+    
+    columns = CHAT_HISTORY_COLUMNS + (", sources" if include_sources else "")
+    query = client.table("chat_history").select(columns).eq("user_id", user_id)
     
     if document_id:
         query = query.eq("document_id", document_id)
     
-    result = query.order("created_at", desc=True).execute()
-    return result.data
+    # Read your own writes: persist buffered messages before reading (the
+    # background flusher retries on its own while the database is failing)
+    if chat_history_writer.running and chat_history_writer.pending() and chat_history_writer.healthy:
+        await chat_history_writer.flush()
+    
+    query = after_cursor(query, cursor).order("created_at", desc=True).order("id", desc=True).limit(limit + 1)
+    result = await run_db(query.execute)
+    return paginate(result.data, limit)
 
-async def create_chat_history(user_id: str, document_id: str, question: str, answer: str, sources: list = None):
-    """Create a new chat history entry"""
+async def write_chat_history_batch(rows: list):
+    """Insert chat history rows in one request; rows already written (same id) are skipped"""
     client = get_supabase()
+    await run_db(client.table("chat_history").upsert(rows, on_conflict="id", ignore_duplicates=True).execute)
+
+def is_permanent_db_error(error: Exception) -> bool:
+    """Postgres data and integrity errors (SQLSTATE classes 22 and 23) fail the same way on every retry"""
+    return str(getattr(error, "code", "") or "")[:2] in ("22", "23")
+
+# Chat messages are written behind the response, batched into multi-row inserts
+chat_history_writer = WriteBehindQueue(
+    "chat_history",
+    write_chat_history_batch,
+    is_permanent=is_permanent_db_error,
+    flush_interval=float(os.getenv("CHAT_HISTORY_FLUSH_INTERVAL", "0.5")),
+    max_batch=int(os.getenv("CHAT_HISTORY_BATCH_SIZE", "100")),
+    max_pending=int(os.getenv("CHAT_HISTORY_MAX_PENDING", "10000")),
+    spill_path=os.getenv("CHAT_HISTORY_SPILL_PATH", ".cache/chat_history_spill.jsonl"),
+    dead_letter_path=os.getenv("CHAT_HISTORY_DEAD_LETTER_PATH", ".cache/chat_history_dead_letter.jsonl")
+)
+
+async def create_chat_history(user_id: str, document_id: str, question: str, answer: str, sources: list = None):
+    """Create a new chat history entry.
     
+    The id and timestamp are assigned here and the row is queued on the
+    write-behind writer when it is running and has room, so the caller does
+    not wait for the insert.
+    """
     data = {
+        "id": str(uuid.uuid4()),
         "user_id": user_id,
         "document_id": document_id,
         "question": question,
         "answer": answer,
         "sources": sources or [],
-        "created_at": "now()"
+        "created_at": datetime.now(timezone.utc).isoformat()
     }
     
-    result = client.table("chat_history").insert(data).execute()
+    # Queue the row; if the writer is stopped or its queue is full, insert it now
+    if chat_history_writer.running and chat_history_writer.put(data):
+        return data
+    
+    client = get_supabase()
+    result = await run_db(client.table("chat_history").insert(data).execute)
     return result.data[0] if result.data else None 
\ No newline at end of file
@@ -1,183 +1,479 @@
 import os
-from typing import List, Dict, Any
+import re
+import asyncio
+import time
+import hashlib
+from typing import List, Dict, Any, AsyncIterator, Callable, Optional
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage, SystemMessage
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
 from langchain.chains.question_answering import load_qa_chain
 
+from utils.lru_cache import LRUCache
+from utils.sections import sample_sections, split_sections
+from utils.red_flag_rules import prefilter_sections
+from utils.clause_library import assemble_document, iter_document_sections, library_document
+from utils.structured_output import RedFlagReport, parse_structured
+from utils.llm_gateway import get_llm_gateway
+from utils.resilience import DeadlineExceeded, resilient
+from utils.response_cache import LLM_RESPONSE_CACHE, cache_bypass, get_response_cache, response_cache_key
+from utils.usage import count_tokens, get_usage_tracker, response_token_counts
+from utils.model_router import ModelTier, estimate_tokens, get_model_router
+from utils.prompts import build_prompt_runnables, get_prompt, get_prompt_runnable, prompt_version
+
 # Global LLM instance
 llm = None
 
-def init_llm():
-    """Initialize Gemini LLM"""
-    global llm
-    
+# Documents longer than this are summarized section by section (map-reduce)
+SUMMARY_MAP_REDUCE_THRESHOLD = int(os.getenv("SUMMARY_MAP_REDUCE_THRESHOLD", "24000"))
+SUMMARY_SECTION_CHARS = int(os.getenv("SUMMARY_SECTION_CHARS", "8000"))
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+
+# Per-section summaries keyed by prompt version and section content hash
+section_summary_cache = LRUCache(max_entries=int(os.getenv("SECTION_SUMMARY_CACHE_SIZE", "5000")))
+
+# Texts longer than this are scanned for red flags section by section
+RED_FLAG_SECTION_THRESHOLD = int(os.getenv("RED_FLAG_SECTION_THRESHOLD", "12000"))
+RED_FLAG_SECTION_CHARS = int(os.getenv("RED_FLAG_SECTION_CHARS", "6000"))
+RED_FLAG_CONCURRENCY = int(os.getenv("RED_FLAG_CONCURRENCY", "4"))
+
+# Send only clauses flagged by the local rule engine (and optionally risk-prototype similarity) to the LLM
+RED_FLAG_PREFILTER = os.getenv("RED_FLAG_PREFILTER", "true").lower() == "true"
+RED_FLAG_PREFILTER_EMBEDDINGS = os.getenv("RED_FLAG_PREFILTER_EMBEDDINGS", "false").lower() == "true"
+# Sampled whole-document overviews analyzed alongside prefiltered sections: each
+# overview prompt holds up to RED_FLAG_OVERVIEW_CHARS, with at least
+# RED_FLAG_OVERVIEW_SAMPLE_CHARS from the start of every section
+RED_FLAG_OVERVIEW_CHARS = int(os.getenv("RED_FLAG_OVERVIEW_CHARS", str(RED_FLAG_SECTION_CHARS)))
+RED_FLAG_OVERVIEW_SAMPLE_CHARS = int(os.getenv("RED_FLAG_OVERVIEW_SAMPLE_CHARS", "500"))
+
+# Per-section red-flag findings keyed by prompt version and section content hash
+section_red_flag_cache = LRUCache(max_entries=int(os.getenv("SECTION_RED_FLAG_CACHE_SIZE", "5000")))
+
+SEVERITY_RANK = {"low": 1, "medium": 2, "high": 3}
+
+# Longest pause between two chunks of a streamed answer; the first chunk gets the tier's deadline
+LLM_STREAM_IDLE_TIMEOUT_SECONDS = float(os.getenv("LLM_STREAM_IDLE_TIMEOUT_SECONDS", "30"))
+
+# Bespoke sections of clause-library documents written concurrently
+DOCUMENT_SECTION_CONCURRENCY = int(os.getenv("DOCUMENT_SECTION_CONCURRENCY", "4"))
+
+# Versions of the prompts behind persisted analyses, taken from the prompt registry
+ANALYSIS_PROMPT_VERSIONS = {
+    "summary": prompt_version("summarize", "section_summary", "combine_summaries", "reduce_summary"),
+    "red_flags": prompt_version("red_flags"),
+    "suggestions": prompt_version("suggestions")
+}
+
+NO_CONTEXT_ANSWER = "I don't have enough context to answer this question. Please upload a document first."
+
+def gemini_client(tier: ModelTier) -> ChatGoogleGenerativeAI:
+    """Create the Gemini client for a model tier"""
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         raise ValueError("GEMINI_API_KEY must be set")
     
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash-exp",
+    return ChatGoogleGenerativeAI(
+        model=tier.model,
         google_api_key=api_key,
-        temperature=0.3,
-        max_output_tokens=2048
+        temperature=tier.temperature,
+        max_output_tokens=tier.max_output_tokens,
+        # Retries, deadlines and hedging are handled by utils.resilience
+        max_retries=0
     )
-    print("✅ Gemini LLM initialized")
+
+def init_llm(llm_factory: Optional[Callable[[ModelTier], Any]] = None):
+    """Initialize one LLM client per model tier.
+    
+    `llm_factory` defaults to Gemini; pass a fake chat model factory to run
+    the pipeline locally.
+    """
+    global llm
+    
+    router = get_model_router()
+    clients = router.init_clients(llm_factory or gemini_client)
+    for tier, client in clients.items():
+        build_prompt_runnables(client, tier, router.deterministic_clients[tier])
+    llm = clients["standard"]
+    
+    tiers = ", ".join(f"{name}={tier.model}" for name, tier in router.tiers.items())
+    print(f"✅ LLM initialized ({tiers})")
 
 def get_llm():
-    """Get the LLM instance"""
+    """Get the standard-tier LLM instance"""
     if llm is None:
         raise RuntimeError("LLM not initialized. Call init_llm() first.")
     return llm
 
-async def answer_question_with_context(question: str, context_chunks: List[str]) -> str:
-    """Answer a question using RAG with context chunks"""
-    if not context_chunks:
-        return "I don't have enough context to answer this question. Please upload a document first."
+def route_prompt(name: str, rendered: str) -> ModelTier:
+    """Pick the model tier for a rendered prompt"""
+    return get_model_router().route(name, estimate_tokens(rendered))
+
+async def run_prompt(name: str, inputs: Dict[str, Any], strip: bool = True) -> str:
+    """Run a registered prompt through the LLM gateway and return the generated text.
+
+    Identical rendered prompts that are already in flight share one provider call,
+    which runs under the deadline and retry policy of the chosen model tier.
+    Responses to cacheable prompts are served from the persistent response cache
+    unless the request asked to bypass it. Every provider call and cache hit
+    is recorded in the usage totals.
+    """
+    started_at = time.perf_counter()
+    spec = get_prompt(name)
+    rendered = spec.prompt.format(**inputs)
+    tier = route_prompt(name, rendered)
+    runnable = get_prompt_runnable(name, tier.name)
+    model = tier.model
+    # Cacheable prompts run at temperature 0 (see build_prompt_runnables)
+    params = tier.deterministic().params if spec.cacheable else tier.params
+    key = response_cache_key(model, spec.key, rendered, params)
     
-    # Combine context chunks
-    context = "\n\n".join(context_chunks)
+    use_cache = LLM_RESPONSE_CACHE and spec.cacheable
+    if use_cache and not cache_bypass.get():
+        cached = await get_response_cache().get(key)
+        if cached is not None:
+            get_usage_tracker().record(name, model, 0, 0, time.perf_counter() - started_at, cached=True)
+            return cached.strip() if strip else cached
     
-    # Create prompt template
-    template = """
-    You are a legal assistant expert. Answer the following question based on the provided legal document context.
+    provider_called = False
     
-    Context:
-    {context}
+    async def call() -> str:
+        nonlocal provider_called
+        provider_called = True
+        called_at = time.perf_counter()
+        response = await resilient(f"llm_{tier.name}", lambda: runnable.ainvoke(inputs))
+        get_usage_tracker().record(
+            name, model, wall_time=time.perf_counter() - called_at,
+            **response_token_counts(response, rendered, response.content)
+        )
+        if use_cache:
+            await get_response_cache().set(key, model, spec.key, response.content)
+        return response.content
     
-    Question: {question}
+    content = await get_llm_gateway().run(key, call)
+    if not provider_called:
+        # Coalesced onto an identical in-flight call: count the request for this endpoint and user
+        get_usage_tracker().record(name, model, 0, 0, time.perf_counter() - started_at, shared=True)
+    return content.strip() if strip else content
+
+async def stream_prompt(name: str, inputs: Dict[str, Any]) -> AsyncIterator[str]:
+    """Stream the model's answer to a registered prompt token by token.
     
-    Answer the question accurately and concisely. If the answer cannot be found in the context, say so.
+    Streams are not retried, but the first chunk must arrive within the tier's
+    deadline and each later one within LLM_STREAM_IDLE_TIMEOUT_SECONDS, or
+    DeadlineExceeded is raised so a hung stream cannot hold the request open.
     """
+    rendered = get_prompt(name).prompt.format(**inputs)
+    tier = route_prompt(name, rendered)
+    runnable = get_prompt_runnable(name, tier.name)
     
-    prompt = PromptTemplate(
-        input_variables=["context", "question"],
-        template=template
-    )
+    # Streams hold a gateway slot but are not coalesced
+    async with get_llm_gateway().slot():
+        started_at = time.perf_counter()
+        completion, usage = [], None
+        chunks = runnable.astream(inputs).__aiter__()
+        received = False
+        try:
+            while True:
+                timeout = LLM_STREAM_IDLE_TIMEOUT_SECONDS if received else tier.timeout
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded(
+                        f"{name} stream waited over {timeout}s for its {'next' if received else 'first'} chunk"
+                    )
+                received = True
+                if getattr(chunk, "usage_metadata", None):
+                    # Chunk usage is a per-chunk delta; the call's usage is the sum
+                    usage = usage or {"input_tokens": 0, "output_tokens": 0}
+                    usage["input_tokens"] += chunk.usage_metadata.get("input_tokens", 0) or 0
+                    usage["output_tokens"] += chunk.usage_metadata.get("output_tokens", 0) or 0
+                if chunk.content:
+                    completion.append(chunk.content)
+                    yield chunk.content
+        finally:
+            if hasattr(chunks, "aclose"):
+                await chunks.aclose()
+            text = "".join(completion)
+            if usage:
+                input_tokens, output_tokens, estimated = usage.get("input_tokens", 0), usage.get("output_tokens", 0), False
+            else:
+                input_tokens, output_tokens, estimated = count_tokens(rendered), count_tokens(text), True
+            get_usage_tracker().record(
+                name, tier.model, input_tokens, output_tokens,
+                time.perf_counter() - started_at, estimated=estimated
+            )
+
+async def answer_question_with_context(question: str, context_chunks: List[str]) -> str:
+    """Answer a question using RAG with context chunks"""
+    if not context_chunks:
+        return NO_CONTEXT_ANSWER
     
-    # Create chain
-    chain = LLMChain(llm=get_llm(), prompt=prompt)
+    # Combine context chunks
+    context = "\n\n".join(context_chunks)
     
     # Generate response
-    response = await chain.ainvoke({"context": context, "question": question})
-    return response["text"].strip()
+    return await run_prompt("qa", {"context": context, "question": question})
 
 async def rewrite_clause(clause: str, instruction: str, system_instruction: str = None) -> str:
     """Rewrite a legal clause based on instruction"""
-    template = """
-    You are a legal expert. Rewrite the following legal clause according to the instruction provided.
+    return await run_prompt("rewrite_clause", {"clause": clause, "instruction": instruction})
+
+def parse_red_flags(raw_text: str) -> Dict[str, Any]:
+    """Parse and validate the model's red-flag JSON, returning None if it cannot be recovered"""
+    report = parse_structured(raw_text, RedFlagReport)
+    return report.model_dump() if report is not None else None
+
+def normalize_severity(severity: Any) -> str:
+    """Map a free-form severity onto high/medium/low, or unknown"""
+    value = str(severity or "").strip().lower()
+    for level in ("high", "medium", "low"):
+        if level in value:
+            return level
+    return "unknown"
+
+def merge_red_flag_reports(reports: List[Dict[str, Any]], section_numbers: Optional[List[Optional[int]]] = None) -> Dict[str, Any]:
+    """Merge per-section red-flag reports into one report in the usual response schema.
     
-    Original clause:
-    {clause}
+    `section_numbers` gives the document section (1-based) each report covers,
+    or None for a whole-document report; by default reports are sections 1..n.
+    """
+    if section_numbers is None:
+        section_numbers = list(range(1, len(reports) + 1))
+    merged: Dict[tuple, Dict[str, Any]] = {}
+    overall_rank = 0
     
-    Instruction: {instruction}
+    for section_number, report in zip(section_numbers, reports):
+        overall_rank = max(overall_rank, SEVERITY_RANK.get(normalize_severity(report.get("overall_risk_level")), 0))
+        
+        for flag in report.get("red_flags") or []:
+            if not isinstance(flag, dict):
+                continue
+            
+            severity = normalize_severity(flag.get("severity"))
+            overall_rank = max(overall_rank, SEVERITY_RANK.get(severity, 0))
+            
+            # Identical findings repeated across sections collapse into one, keeping the highest severity
+            key = (
+                str(flag.get("type", "")).strip().lower(),
+                re.sub(r"\W+", " ", str(flag.get("description", ""))).strip().lower()
+            )
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = {**flag, "severity": severity, "section": section_number}
+            elif SEVERITY_RANK.get(severity, 0) > SEVERITY_RANK.get(existing["severity"], 0):
+                existing["severity"] = severity
     
-    IMPORTANT: Return ONLY the rewritten clause. Do not include explanations, multiple options, or any additional text. Just provide the single rewritten version of the clause.
-    """
+    red_flags = sorted(
+        merged.values(),
+        key=lambda flag: (-SEVERITY_RANK.get(flag["severity"], 0), flag["section"] or 0)
+    )
+    assessed = any(normalize_severity(report.get("overall_risk_level")) != "unknown" for report in reports)
+    overall_risk_level = next(
+        (level for level, rank in SEVERITY_RANK.items() if rank == overall_rank),
+        "low" if assessed else "unknown"
+    )
     
-    prompt = PromptTemplate(
-        input_variables=["clause", "instruction"],
-        template=template
+    counts = {level: sum(1 for flag in red_flags if flag["severity"] == level) for level in ("high", "medium", "low")}
+    sections_analyzed = sum(1 for number in section_numbers if number is not None)
+    overviews = len(section_numbers) - sections_analyzed
+    summary = (
+        f"Analyzed {sections_analyzed} sections{f' and {overviews} document overviews' if overviews else ''} and found {len(red_flags)} potential red flags "
+        f"({counts['high']} high, {counts['medium']} medium, {counts['low']} low severity)."
     )
     
-    chain = LLMChain(llm=get_llm(), prompt=prompt)
-    response = await chain.ainvoke({"clause": clause, "instruction": instruction})
-    return response["text"].strip()
+    return {
+        "red_flags": red_flags,
+        "overall_risk_level": overall_risk_level,
+        "summary": summary,
+        "sections_analyzed": sections_analyzed
+    }
+
+async def scan_red_flags_by_section(text: str) -> Dict[str, Any]:
+    """Scan clause sections for red flags concurrently and merge the findings"""
+    sections = split_sections(text, max_chars=RED_FLAG_SECTION_CHARS)
+    total_sections = len(sections)
+    numbered = list(enumerate(sections, start=1))
+    overviews = []
+    
+    if RED_FLAG_PREFILTER:
+        kept = await asyncio.to_thread(prefilter_sections, sections, RED_FLAG_PREFILTER_EMBEDDINGS)
+        print(f"🔎 Prefilter kept {len(kept)} of {total_sections} sections for LLM analysis")
+        numbered = [(index + 1, section) for index, section in kept]
+        
+        # The prefilter only finds risky wording; missing clauses and ambiguous terms
+        # need the whole document, so sampled overviews covering every section are analyzed as well
+        overviews = sample_sections(sections, RED_FLAG_OVERVIEW_CHARS, RED_FLAG_OVERVIEW_SAMPLE_CHARS)
+    
+    semaphore = asyncio.Semaphore(RED_FLAG_CONCURRENCY)
+    
+    async def scan_section(section: str) -> Dict[str, Any]:
+        key = hashlib.sha256(f"{get_prompt('red_flags').key}\n{section}".encode("utf-8")).hexdigest()
+        report = section_red_flag_cache.get(key)
+        if report is not None:
+            return report
+        
+        async with semaphore:
+            raw_text = await run_prompt("red_flags", {"text": section})
+        
+        report = parse_red_flags(raw_text)
+        if report is None:
+            # Keep the section in the count but do not cache an unparseable answer
+            return {"red_flags": [], "overall_risk_level": "unknown"}
+        
+        section_red_flag_cache.set(key, report)
+        return report
+    
+    section_numbers = [number for number, _ in numbered]
+    texts = [section for _, section in numbered]
+    section_numbers.extend([None] * len(overviews))
+    texts.extend(overviews)
+    
+    reports = await asyncio.gather(*[scan_section(section) for section in texts])
+    print(f"🚩 Scanned {len(numbered)} sections and {len(overviews)} document overviews for red flags")
+    return merge_red_flag_reports(reports, section_numbers)
 
 async def detect_red_flags(text: str) -> Dict[str, Any]:
     """Detect potential red flags in legal text"""
-    template = """
-    You are a legal risk assessment expert. Analyze the following legal text and identify potential red flags, risks, or problematic clauses.
-    
-    Text to analyze:
-    {text}
-    
-    Please provide a JSON response with the following structure:
-    {{
-        "red_flags": [
-            {{
-                "type": "risk_category",
-                "description": "description of the risk",
-                "severity": "high/medium/low",
-                "suggestion": "suggestion for improvement"
-            }}
-        ],
-        "overall_risk_level": "high/medium/low",
-        "summary": "brief summary of findings"
-    }}
-    
-    Focus on:
-    - Unclear or ambiguous language
-    - Unfair terms
-    - Missing important clauses
-    - Excessive liability
-    - Unreasonable obligations
-    """
+    if len(text) > RED_FLAG_SECTION_THRESHOLD:
+        return await scan_red_flags_by_section(text)
     
-    prompt = PromptTemplate(
-        input_variables=["text"],
-        template=template
-    )
+    raw_text = await run_prompt("red_flags", {"text": text})
     
-    chain = LLMChain(llm=get_llm(), prompt=prompt)
-    response = await chain.ainvoke({"text": text})
-    
-    # Try to parse JSON response
-    try:
-        import json
-        return json.loads(response["text"])
-    except:
-        # Fallback to text response
-        return {
-            "red_flags": [],
-            "overall_risk_level": "unknown",
-            "summary": response["text"],
-            "raw_response": response["text"]
-        }
+    # Parse the JSON response, recovering from code fences and trivial syntax errors
+    red_flags = parse_red_flags(raw_text)
+    if red_flags is not None:
+        return red_flags
+    
+    # Fallback to text response
+    return {
+        "red_flags": [],
+        "overall_risk_level": "unknown",
+        "summary": raw_text,
+        "raw_response": raw_text
+    }
+
+async def write_document_section(doc_type: str, section: str, instruction: str, details: str) -> str:
+    """Write one bespoke section of a clause-library document"""
+    return await run_prompt("document_section", {
+        "doc_type": doc_type,
+        "section": section,
+        "instruction": instruction,
+        "details": details
+    })
 
 async def generate_document(doc_type: str, details: Dict[str, Any]) -> str:
-    """Generate a new legal document"""
-    template = """
-    You are a legal document generator. Create a {doc_type} based on the following details:
+    """Generate a new legal document.
     
-    Details:
-    {details}
-    
-    Please generate a complete, legally sound {doc_type} document. Include all necessary sections, proper formatting, and standard legal language.
+    Document types in the clause library are assembled from standard clauses,
+    with only the bespoke sections written by the LLM, when the details fill
+    every standard clause; other types and details are generated in full.
     """
+    if library_document(doc_type, details):
+        return await assemble_document(
+            doc_type,
+            details,
+            lambda section, instruction, text: write_document_section(doc_type, section, instruction, text),
+            max_concurrency=DOCUMENT_SECTION_CONCURRENCY
+        )
     
-    prompt = PromptTemplate(
-        input_variables=["doc_type", "details"],
-        template=template
-    )
+    return await run_prompt("generate_document", {"doc_type": doc_type, "details": str(details)})
+
+async def summarize_sections(text: str) -> List[str]:
+    """Summarize the sections of a long document concurrently, reusing cached section summaries"""
+    sections = split_sections(text, max_chars=SUMMARY_SECTION_CHARS)
+    semaphore = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+    
+    async def summarize_section(section: str) -> str:
+        key = hashlib.sha256(f"{get_prompt('section_summary').key}\n{section}".encode("utf-8")).hexdigest()
+        summary = section_summary_cache.get(key)
+        if summary is not None:
+            return summary
+        
+        async with semaphore:
+            summary = await run_prompt("section_summary", {"text": section})
+        section_summary_cache.set(key, summary)
+        return summary
     
-    chain = LLMChain(llm=get_llm(), prompt=prompt)
-    response = await chain.ainvoke({"doc_type": doc_type, "details": str(details)})
-    return response["text"].strip()
+    summaries = await asyncio.gather(*[summarize_section(section) for section in sections])
+    print(f"📝 Summarized {len(sections)} sections")
+    return summaries
+
+async def reduce_summaries(summaries: List[str]) -> str:
+    """Combine section summaries level by level until they fit in a single reduce prompt"""
+    semaphore = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+    
+    async def combine(group: List[str]) -> str:
+        if len(group) == 1:
+            return group[0]
+        async with semaphore:
+            return await run_prompt("combine_summaries", {"summaries": "\n\n".join(group)})
+    
+    while len(summaries) > 1 and len("\n\n".join(summaries)) > SUMMARY_MAP_REDUCE_THRESHOLD:
+        # Every group holds at least two summaries, so each level strictly shrinks the list
+        groups, current = [], []
+        for summary in summaries:
+            if len(current) >= 2 and len("\n\n".join(current + [summary])) > SUMMARY_SECTION_CHARS:
+                groups.append(current)
+                current = []
+            current.append(summary)
+        if current:
+            groups.append(current)
+        
+        summaries = await asyncio.gather(*[combine(group) for group in groups])
+    
+    return "\n\n".join(
+        f"Section {i + 1} summary:\n{summary}" for i, summary in enumerate(summaries)
+    )
 
 async def summarize_document(text: str) -> str:
     """Generate a summary of a legal document"""
-    template = """
-    You are a legal expert. Provide a comprehensive summary of the following legal document:
-    
-    Document:
-    {text}
-    
-    Please provide a structured summary including:
-    1. Document type and purpose
-    2. Key parties involved
-    3. Main terms and conditions
-    4. Important dates and deadlines
-    5. Key obligations and rights
-    6. Any notable clauses or provisions
-    """
+    if len(text) > SUMMARY_MAP_REDUCE_THRESHOLD:
+        summaries = await reduce_summaries(await summarize_sections(text))
+        return await run_prompt("reduce_summary", {"summaries": summaries})
     
-    prompt = PromptTemplate(
-        input_variables=["text"],
-        template=template
-    )
+    return await run_prompt("summarize", {"text": text})
+
+async def improve_language(text: str) -> str:
+    """Improve the clarity and precision of legal text"""
+    return await run_prompt("improve_language", {"text": text})
+
+async def stream_answer_question_with_context(question: str, context_chunks: List[str]) -> AsyncIterator[str]:
+    """Stream a RAG answer for a question using context chunks"""
+    if not context_chunks:
+        yield NO_CONTEXT_ANSWER
+        return
     
-    chain = LLMChain(llm=get_llm(), prompt=prompt)
-    response = await chain.ainvoke({"text": text})
-    return response["text"].strip() 
\ No newline at end of file
+    async for token in stream_prompt("qa", {"context": "\n\n".join(context_chunks), "question": question}):
+        yield token
+
+def stream_rewrite_clause(clause: str, instruction: str) -> AsyncIterator[str]:
+    """Stream a rewritten legal clause"""
+    return stream_prompt("rewrite_clause", {"clause": clause, "instruction": instruction})
+
+def stream_generate_document(doc_type: str, details: Dict[str, Any]) -> AsyncIterator[str]:
+    """Stream a newly generated legal document; clause-library documents stream section by section"""
+    if library_document(doc_type, details):
+        return iter_document_sections(
+            doc_type,
+            details,
+            lambda section, instruction, text: write_document_section(doc_type, section, instruction, text),
+            max_concurrency=DOCUMENT_SECTION_CONCURRENCY
+        )
+    
+    return stream_prompt("generate_document", {"doc_type": doc_type, "details": str(details)})
+
+async def stream_summarize_document(text: str) -> AsyncIterator[str]:
+    """Stream a summary of a legal document; long documents stream only the final reduce step"""
+    if len(text) > SUMMARY_MAP_REDUCE_THRESHOLD:
+        summaries = await reduce_summaries(await summarize_sections(text))
+        name, inputs = "reduce_summary", {"summaries": summaries}
+    else:
+        name, inputs = "summarize", {"text": text}
+    
+    async for token in stream_prompt(name, inputs):
+        yield token
+
+def stream_improve_language(text: str) -> AsyncIterator[str]:
+    """Stream an improved version of legal text"""
+    return stream_prompt("improve_language", {"text": text})
@@ -0,0 +1,170 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Gateway configuration
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_CONCURRENCY_PER_USER = int(os.getenv("LLM_MAX_CONCURRENCY_PER_USER", "3"))
+
+# User on whose behalf LLM calls in the current request are made
+current_user_id: ContextVar[Optional[str]] = ContextVar("current_user_id", default=None)
+
+class LLMGateway:
+    """Front door for every LLM call.
+
+    Identical in-flight prompts are coalesced into one provider call
+    (single-flight), and calls are admitted under a global and a per-user
+    concurrency cap. Waiting users are served round-robin so one user's burst
+    cannot starve the others.
+    """
+
+    def __init__(self, max_concurrency: int, max_concurrency_per_user: int):
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_user = max_concurrency_per_user
+        self._inflight: Dict[str, Dict[str, Any]] = {}
+        self._active_total = 0
+        self._active_per_user: Dict[str, int] = {}
+        self._waiting: "OrderedDict[str, deque]" = OrderedDict()
+        self._wait_times = deque(maxlen=1000)
+        self.total_calls = 0
+        self.coalesced_calls = 0
+
+    def _can_start(self, user: str) -> bool:
+        return (
+            self._active_total < self.max_concurrency
+            and self._active_per_user.get(user, 0) < self.max_concurrency_per_user
+        )
+
+    def _acquire(self, user: str):
+        self._active_total += 1
+        self._active_per_user[user] = self._active_per_user.get(user, 0) + 1
+
+    def _release(self, user: str):
+        self._active_total -= 1
+        self._active_per_user[user] -= 1
+        if not self._active_per_user[user]:
+            del self._active_per_user[user]
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand free slots to waiting users in round-robin order"""
+        while self._active_total < self.max_concurrency:
+            for user in list(self._waiting):
+                if self._active_per_user.get(user, 0) < self.max_concurrency_per_user:
+                    break
+            else:
+                return
+
+            queue = self._waiting[user]
+            waiter = queue.popleft()
+            if queue:
+                # Move the user to the back so other users get the next slot
+                self._waiting.move_to_end(user)
+            else:
+                del self._waiting[user]
+
+            self._acquire(user)
+            waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, user_id: Optional[str] = None):
+        """Hold one concurrency slot for the duration of an LLM call"""
+        user = user_id or current_user_id.get() or "anonymous"
+        enqueued_at = time.monotonic()
+
+        if self._can_start(user):
+            self._acquire(user)
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiting.setdefault(user, deque()).append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was granted just before cancellation; give it back
+                    self._release(user)
+                else:
+                    queue = self._waiting.get(user)
+                    if queue is not None and waiter in queue:
+                        queue.remove(waiter)
+                        if not queue:
+                            del self._waiting[user]
+                raise
+
+        self._wait_times.append(time.monotonic() - enqueued_at)
+        try:
+            yield
+        finally:
+            self._release(user)
+
+    async def _execute(self, call: Callable[[], Awaitable[Any]], user_id: Optional[str]) -> Any:
+        async with self.slot(user_id):
+            return await call()
+
+    async def run(self, key: str, call: Callable[[], Awaitable[Any]], user_id: Optional[str] = None) -> Any:
+        """Run an LLM call, sharing the result with identical in-flight calls.
+
+        The provider call is cancelled only when every caller waiting on it
+        has been cancelled.
+        """
+        self.total_calls += 1
+        entry = self._inflight.get(key)
+
+        if entry is None:
+            task = asyncio.create_task(self._execute(call, user_id or current_user_id.get()))
+            entry = {"task": task, "waiters": 0}
+            self._inflight[key] = entry
+
+            def forget(_, key=key, entry=entry):
+                if self._inflight.get(key) is entry:
+                    del self._inflight[key]
+
+            task.add_done_callback(forget)
+        else:
+            self.coalesced_calls += 1
+
+        entry["waiters"] += 1
+        try:
+            return await asyncio.shield(entry["task"])
+        except asyncio.CancelledError:
+            if entry["waiters"] == 1 and not entry["task"].done():
+                entry["task"].cancel()
+            raise
+        finally:
+            entry["waiters"] -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return queue depth, concurrency and wait-time metrics"""
+        wait_times = sorted(self._wait_times)
+        count = len(wait_times)
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_concurrency_per_user": self.max_concurrency_per_user,
+            "active_calls": self._active_total,
+            "active_users": len(self._active_per_user),
+            "queue_depth": sum(len(queue) for queue in self._waiting.values()),
+            "queued_users": len(self._waiting),
+            "inflight_prompts": len(self._inflight),
+            "total_calls": self.total_calls,
+            "coalesced_calls": self.coalesced_calls,
+            "wait_time_ms": {
+                "samples": count,
+                "avg": round(sum(wait_times) / count * 1000, 2) if count else 0.0,
+                "p95": round(wait_times[min(count - 1, int(count * 0.95))] * 1000, 2) if count else 0.0,
+                "max": round(wait_times[-1] * 1000, 2) if count else 0.0
+            }
+        }
+
+# Global gateway instance
+llm_gateway = LLMGateway(
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    max_concurrency_per_user=LLM_MAX_CONCURRENCY_PER_USER
+)
+
+def get_llm_gateway() -> LLMGateway:
+    """Get the global LLM gateway instance"""
+    return llm_gateway
@@ -0,0 +1,127 @@
+import os
+from typing import Any, Callable, Dict
+
+# Model tiers: the model and output cap used for each class of call
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", "gemini-2.0-flash-lite")
+LLM_FAST_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_FAST_MAX_OUTPUT_TOKENS", "256"))
+LLM_STANDARD_MODEL = os.getenv("LLM_STANDARD_MODEL", "gemini-2.0-flash-exp")
+LLM_STANDARD_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_STANDARD_MAX_OUTPUT_TOKENS", "2048"))
+LLM_LONG_MODEL = os.getenv("LLM_LONG_MODEL", "gemini-2.0-flash-exp")
+LLM_LONG_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_LONG_MAX_OUTPUT_TOKENS", "8192"))
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.3"))
+
+# Deadline of one provider call per tier; long-tier generation legitimately takes minutes
+LLM_FAST_TIMEOUT_SECONDS = float(os.getenv("LLM_FAST_TIMEOUT_SECONDS", "20"))
+LLM_STANDARD_TIMEOUT_SECONDS = float(os.getenv("LLM_STANDARD_TIMEOUT_SECONDS", "60"))
+LLM_LONG_TIMEOUT_SECONDS = float(os.getenv("LLM_LONG_TIMEOUT_SECONDS", "300"))
+
+# Inputs above these estimated token counts move up a tier
+LLM_FAST_MAX_INPUT_TOKENS = int(os.getenv("LLM_FAST_MAX_INPUT_TOKENS", "2000"))
+LLM_LONG_INPUT_TOKENS = int(os.getenv("LLM_LONG_INPUT_TOKENS", "32000"))
+
+TIER_ORDER = ["fast", "standard", "long"]
+
+# Tier each prompt starts on; prompts not listed use the standard tier. Only prompts
+# with short answers belong on the fast tier, whose output cap is small (three
+# alternatives with explanations do not fit in it).
+# Override with LLM_PROMPT_TIERS, e.g. "auto_complete=fast,generate_document=long".
+DEFAULT_PROMPT_TIERS = {
+    "auto_complete": "fast",
+    "generate_document": "long",
+}
+
+class ModelTier:
+    """A model, output cap and call deadline that calls can be routed to"""
+
+    def __init__(self, name: str, model: str, max_output_tokens: int, temperature: float, timeout: float = 60.0):
+        self.name = name
+        self.model = model
+        self.max_output_tokens = max_output_tokens
+        self.temperature = temperature
+        self.timeout = timeout
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        """Generation parameters that affect the model's output, for cache keys"""
+        return {"temperature": self.temperature, "max_output_tokens": self.max_output_tokens}
+
+    def deterministic(self) -> "ModelTier":
+        """The same model and output cap at temperature 0, for prompts whose responses are cached"""
+        return ModelTier(self.name, self.model, self.max_output_tokens, 0.0, self.timeout)
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for routing decisions (about four characters per token)"""
+    return len(text or "") // 4 + 1
+
+def parse_prompt_tiers(value: str) -> Dict[str, str]:
+    """Parse "prompt=tier,prompt=tier" overrides"""
+    tiers = {}
+    for item in (value or "").split(","):
+        name, _, tier = item.partition("=")
+        if name.strip() and tier.strip() in TIER_ORDER:
+            tiers[name.strip()] = tier.strip()
+    return tiers
+
+class ModelRouter:
+    """Picks a model tier per prompt and input size and holds the clients of each tier.
+
+    Clients are created by `llm_factory(tier)`, so tests can route against a
+    local fake LLM instead of Gemini.
+    """
+
+    def __init__(
+        self,
+        tiers: Dict[str, ModelTier],
+        prompt_tiers: Dict[str, str],
+        fast_max_input_tokens: int,
+        long_input_tokens: int
+    ):
+        self.tiers = tiers
+        self.prompt_tiers = prompt_tiers
+        self.fast_max_input_tokens = fast_max_input_tokens
+        self.long_input_tokens = long_input_tokens
+        self.clients: Dict[str, Any] = {}
+        self.deterministic_clients: Dict[str, Any] = {}
+
+    def init_clients(self, llm_factory: Callable[[ModelTier], Any]) -> Dict[str, Any]:
+        """Create one client per tier, plus a temperature-0 client for cached prompts"""
+        self.clients = {name: llm_factory(tier) for name, tier in self.tiers.items()}
+        self.deterministic_clients = {
+            name: self.clients[name] if tier.temperature == 0 else llm_factory(tier.deterministic())
+            for name, tier in self.tiers.items()
+        }
+        return self.clients
+
+    def route(self, prompt_name: str, input_tokens: int) -> ModelTier:
+        """Choose the tier for a prompt given its estimated input size"""
+        tier = self.prompt_tiers.get(prompt_name, "standard")
+
+        if tier == "fast" and input_tokens > self.fast_max_input_tokens:
+            tier = "standard"
+        if input_tokens > self.long_input_tokens:
+            tier = "long"
+
+        return self.tiers[tier]
+
+    def get_client(self, tier: str) -> Any:
+        """Get the client of a tier"""
+        client = self.clients.get(tier)
+        if client is None:
+            raise RuntimeError("LLM not initialized. Call init_llm() first.")
+        return client
+
+# Global model router instance
+model_router = ModelRouter(
+    tiers={
+        "fast": ModelTier("fast", LLM_FAST_MODEL, LLM_FAST_MAX_OUTPUT_TOKENS, LLM_TEMPERATURE, LLM_FAST_TIMEOUT_SECONDS),
+        "standard": ModelTier("standard", LLM_STANDARD_MODEL, LLM_STANDARD_MAX_OUTPUT_TOKENS, LLM_TEMPERATURE, LLM_STANDARD_TIMEOUT_SECONDS),
+        "long": ModelTier("long", LLM_LONG_MODEL, LLM_LONG_MAX_OUTPUT_TOKENS, LLM_TEMPERATURE, LLM_LONG_TIMEOUT_SECONDS),
+    },
+    prompt_tiers={**DEFAULT_PROMPT_TIERS, **parse_prompt_tiers(os.getenv("LLM_PROMPT_TIERS", ""))},
+    fast_max_input_tokens=LLM_FAST_MAX_INPUT_TOKENS,
+    long_input_tokens=LLM_LONG_INPUT_TOKENS
+)
+
+def get_model_router() -> ModelRouter:
+    """Get the global model router instance"""
+    return model_router
@@ -0,0 +1,254 @@
+import os
+from typing import Any, Dict, Optional
+from langchain.prompts import PromptTemplate
+
+# Prompt templates
+QA_TEMPLATE = """
+    You are a legal assistant expert. Answer the following question based on the provided legal document context.
+    
+    Context:
+    {context}
+    
+    Question: {question}
+    
+    Answer the question accurately and concisely. If the answer cannot be found in the context, say so.
+    """
+
+REWRITE_CLAUSE_TEMPLATE = """
+    You are a legal expert. Rewrite the following legal clause according to the instruction provided.
+    
+    Original clause:
+    {clause}
+    
+    Instruction: {instruction}
+    
+    IMPORTANT: Return ONLY the rewritten clause. Do not include explanations, multiple options, or any additional text. Just provide the single rewritten version of the clause.
+    """
+
+RED_FLAGS_TEMPLATE = """
+    You are a legal risk assessment expert. Analyze the following legal text and identify potential red flags, risks, or problematic clauses.
+    
+    Text to analyze:
+    {text}
+    
+    Please provide a JSON response with the following structure:
+    {{
+        "red_flags": [
+            {{
+                "type": "risk_category",
+                "description": "description of the risk",
+                "severity": "high/medium/low",
+                "suggestion": "suggestion for improvement"
+            }}
+        ],
+        "overall_risk_level": "high/medium/low",
+        "summary": "brief summary of findings"
+    }}
+    
+    Focus on:
+    - Unclear or ambiguous language
+    - Unfair terms
+    - Missing important clauses
+    - Excessive liability
+    - Unreasonable obligations
+    
+    Respond with the JSON object only.
+    """
+
+GENERATE_DOCUMENT_TEMPLATE = """
+    You are a legal document generator. Create a {doc_type} based on the following details:
+    
+    Details:
+    {details}
+    
+    Please generate a complete, legally sound {doc_type} document. Include all necessary sections, proper formatting, and standard legal language.
+    """
+
+DOCUMENT_SECTION_TEMPLATE = """
+    You are a legal document drafter writing one section of a {doc_type}. The rest of the document uses standard clauses.
+    
+    Section: {section}
+    Instruction: {instruction}
+    
+    Details:
+    {details}
+    
+    Write only the body of this section in clear, standard legal language. Do not repeat the section heading or add other sections.
+    """
+
+SUMMARIZE_TEMPLATE = """
+    You are a legal expert. Provide a comprehensive summary of the following legal document:
+    
+    Document:
+    {text}
+    
+    Please provide a structured summary including:
+    1. Document type and purpose
+    2. Key parties involved
+    3. Main terms and conditions
+    4. Important dates and deadlines
+    5. Key obligations and rights
+    6. Any notable clauses or provisions
+    """
+
+SECTION_SUMMARY_TEMPLATE = """
+    You are a legal expert. Summarize the following section of a longer legal document.
+    
+    Section:
+    {text}
+    
+    Capture the parties, obligations, rights, amounts, dates, deadlines and any unusual or risky provisions it contains. Be concise and do not speculate about other sections.
+    """
+
+COMBINE_SUMMARIES_TEMPLATE = """
+    You are a legal expert. Merge the following consecutive section summaries of a legal document into one shorter summary, keeping every party, obligation, amount, date and notable provision:
+    
+    {summaries}
+    """
+
+REDUCE_SUMMARY_TEMPLATE = """
+    You are a legal expert. The following are summaries of consecutive sections of one legal document. Combine them into a comprehensive summary of the whole document:
+    
+    {summaries}
+    
+    Please provide a structured summary including:
+    1. Document type and purpose
+    2. Key parties involved
+    3. Main terms and conditions
+    4. Important dates and deadlines
+    5. Key obligations and rights
+    6. Any notable clauses or provisions
+    """
+
+IMPROVE_LANGUAGE_TEMPLATE = """
+        You are a legal writing expert. Improve the following legal text for clarity, precision, and readability while maintaining its legal meaning:
+        
+        Original text:
+        {text}
+        
+        Please provide an improved version that:
+        1. Is clearer and more readable
+        2. Uses precise legal language
+        3. Eliminates ambiguity
+        4. Maintains the original legal intent
+        5. Follows proper legal writing conventions
+        """
+
+AUTO_COMPLETE_TEMPLATE = """
+        You are a legal expert. Complete the following legal text in a natural and legally sound way:
+        
+        {text}
+        
+        Context (if any): {context}
+        
+        Please continue the text in a way that makes legal sense and follows proper legal writing conventions.
+        """
+
+SUGGEST_ALTERNATIVES_TEMPLATE = """
+        You are a legal expert. Provide 3 alternative phrasings for the following legal text, each with different levels of formality and emphasis:
+        
+        Original text:
+        {text}
+        
+        Please provide:
+        1. A more formal/technical version
+        2. A clearer/simpler version
+        3. A more comprehensive/detailed version
+        
+        For each alternative, explain the key differences and when it might be preferred.
+        """
+
+SUGGESTIONS_TEMPLATE = """
+        Analyze this legal document and provide specific suggestions for improvement:
+        
+        {content}
+        
+        Please provide suggestions in the following areas:
+        1. Clarity and readability
+        2. Legal completeness
+        3. Risk mitigation
+        4. Missing clauses
+        5. Ambiguous language
+        """
+
+class PromptSpec:
+    """A named, versioned prompt whose template is parsed once at import.
+
+    Responses to `cacheable` prompts are reused for identical rendered prompts
+    and generation parameters, including across restarts. `json_mode` prompts
+    ask the model for a JSON response (MIME type application/json).
+    """
+
+    def __init__(self, name: str, version: str, template: str, cacheable: bool = False, json_mode: bool = False):
+        self.name = name
+        self.version = version
+        self.template = template
+        self.cacheable = cacheable
+        self.json_mode = json_mode
+        self.prompt = PromptTemplate.from_template(template)
+
+    @property
+    def key(self) -> str:
+        """Identifier that changes whenever the prompt changes; used in cache keys"""
+        return f"{self.name}@{self.version}"
+
+# Every prompt the backend sends to the LLM. Bump a version when its template
+# (or the pipeline consuming its output) changes so cached results are not reused.
+PROMPT_REGISTRY: Dict[str, PromptSpec] = {
+    spec.name: spec
+    for spec in [
+        PromptSpec("qa", "1", QA_TEMPLATE),
+        PromptSpec("rewrite_clause", "1", REWRITE_CLAUSE_TEMPLATE),
+        PromptSpec("red_flags", "4", RED_FLAGS_TEMPLATE, cacheable=True, json_mode=True),
+        PromptSpec("generate_document", "1", GENERATE_DOCUMENT_TEMPLATE),
+        PromptSpec("document_section", "1", DOCUMENT_SECTION_TEMPLATE),
+        PromptSpec("summarize", "2", SUMMARIZE_TEMPLATE, cacheable=True),
+        PromptSpec("section_summary", "1", SECTION_SUMMARY_TEMPLATE, cacheable=True),
+        PromptSpec("combine_summaries", "1", COMBINE_SUMMARIES_TEMPLATE, cacheable=True),
+        PromptSpec("reduce_summary", "1", REDUCE_SUMMARY_TEMPLATE, cacheable=True),
+        PromptSpec("improve_language", "1", IMPROVE_LANGUAGE_TEMPLATE),
+        PromptSpec("auto_complete", "1", AUTO_COMPLETE_TEMPLATE),
+        PromptSpec("suggest_alternatives", "1", SUGGEST_ALTERNATIVES_TEMPLATE),
+        PromptSpec("suggestions", "1", SUGGESTIONS_TEMPLATE, cacheable=True),
+    ]
+}
+
+# Ask Gemini for JSON output on json_mode prompts; merged into the client's generation config
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "true").lower() == "true"
+JSON_MODE_KWARGS = {"generation_config": {"response_mime_type": "application/json"}}
+
+# Prebuilt prompt | llm runnables per model tier, created once by build_prompt_runnables()
+_prompt_runnables: Dict[str, Dict[str, Any]] = {}
+
+def build_prompt_runnables(llm: Any, tier: str = "standard", cacheable_llm: Optional[Any] = None):
+    """Compose every registered prompt with a model tier's LLM once at startup.
+
+    Cacheable prompts use `cacheable_llm` (the tier at temperature 0) so that a
+    cached response is the answer the model would give again, not one sample.
+    """
+    def compose(spec: PromptSpec) -> Any:
+        model = cacheable_llm if spec.cacheable and cacheable_llm is not None else llm
+        if spec.json_mode and LLM_JSON_MODE:
+            model = model.bind(**JSON_MODE_KWARGS)
+        return spec.prompt | model
+
+    _prompt_runnables[tier] = {name: compose(spec) for name, spec in PROMPT_REGISTRY.items()}
+    print(f"✅ Built {len(_prompt_runnables[tier])} prompt runnables for the {tier} tier")
+
+def get_prompt(name: str) -> PromptSpec:
+    """Get a registered prompt by name"""
+    spec = PROMPT_REGISTRY.get(name)
+    if spec is None:
+        raise KeyError(f"Unknown prompt: {name}")
+    return spec
+
+def get_prompt_runnable(name: str, tier: str = "standard") -> Any:
+    """Get the prebuilt runnable for a registered prompt on a model tier"""
+    runnable = _prompt_runnables.get(tier, {}).get(name)
+    if runnable is None:
+        raise RuntimeError("Prompt runnables not built. Call init_llm() first.")
+    return runnable
+
+def prompt_version(*names: str) -> str:
+    """Combined version of one or more prompts, for cache keys"""
+    return "+".join(get_prompt(name).key for name in names)
@@ -0,0 +1,138 @@
+import os
+import re
+from typing import List, Dict, Any, Optional, Tuple
+
+from utils.sections import split_clauses
+
+# Similarity to a risk prototype above which a clause counts as suspicious
+RISK_PROTOTYPE_THRESHOLD = float(os.getenv("RISK_PROTOTYPE_THRESHOLD", "0.55"))
+
+# (category, severity, pattern) for clause language that commonly carries risk
+RISK_RULES = [
+    ("unlimited_liability", "high",
+     r"\bunlimited liability\b|\bliabilit(?:y|ies) (?:shall|will) not be (?:limited|capped)\b"
+     r"|\bwithout (?:any )?limit(?:ation)?(?: as to amount| of liability)?\b"
+     r"|\bfully liable\b|\bliable for (?:any and )?all\b"),
+    ("broad_indemnity", "high",
+     r"\bindemnif(?:y|ies|ication)\b[^.]{0,200}\b(?:any and all|all (?:claims|losses|damages|liabilities)|howsoever|whether or not)\b"
+     r"|\bhold (?:\w+ )?harmless\b"),
+    ("auto_renewal", "medium",
+     r"\bautomatic(?:ally)? renew(?:s|ed|al)?\b|\bauto[- ]?renew(?:s|al)?\b"
+     r"|\brenew(?:s|ed)? for (?:successive|additional|further) (?:periods|terms)\b|\bevergreen\b"),
+    ("unilateral_amendment", "high",
+     r"\bmay (?:amend|modify|change|update|revise) (?:this agreement|these terms|the terms|any (?:term|provision))[^.]{0,120}\b(?:at any time|sole discretion|without (?:prior )?notice)\b"
+     r"|\breserves the right to (?:amend|modify|change|update|revise)\b"),
+    ("unilateral_price_change", "medium",
+     r"\bmay (?:increase|raise|adjust|change) (?:its|the|any) (?:fees|prices|rates|charges)\b"),
+    ("sole_discretion", "medium",
+     r"\b(?:in|at) (?:its|their|his|her) (?:sole|absolute|unfettered) discretion\b"),
+    ("termination_without_cause", "medium",
+     r"\bterminat(?:e|ion)\b[^.]{0,120}\b(?:for convenience|without cause|for any reason or no reason|at any time without)\b"),
+    ("without_notice", "medium",
+     r"\bwithout (?:any )?(?:prior |advance )?notice\b"),
+    ("liquidated_damages", "medium",
+     r"\bliquidated damages\b|\bpenalt(?:y|ies)\b|\blate (?:payment )?(?:fee|charge|interest)s?\b"),
+    ("limitation_of_remedies", "medium",
+     r"\bsole and exclusive remedy\b|\bwaives? (?:any and )?all (?:rights|claims|remedies)\b"
+     r"|\bin no event shall\b[^.]{0,160}\bliable\b"),
+    ("warranty_disclaimer", "low",
+     r"\b(?:provided |delivered )?[\"']?as is[\"']?\b|\bdisclaims? (?:all|any) (?:warranties|representations)\b"),
+    ("non_compete", "high",
+     r"\bnon[- ]?compet(?:e|ition)\b|\bshall not (?:directly or indirectly )?(?:compete|engage in any (?:business|activity) (?:that|which) competes)\b"
+     r"|\bnon[- ]?solicit(?:ation)?\b"),
+    ("dispute_waiver", "medium",
+     r"\bwaives? (?:any )?(?:right to (?:a )?)?(?:jury trial|trial by jury)\b|\bclass action waiver\b"
+     r"|\bwaives? (?:any )?right to (?:participate in|bring) (?:a )?class\b|\bbinding arbitration\b"),
+    ("perpetual_or_irrevocable", "medium",
+     r"\b(?:perpetual|irrevocable)\b"),
+    ("broad_ip_assignment", "high",
+     r"\bassigns? (?:to \w+ )?(?:all|any and all) (?:right, title and interest|rights?|intellectual property)\b"
+     r"|\bwork made for hire\b"),
+    ("assignment_without_consent", "medium",
+     r"\bmay assign\b[^.]{0,120}\bwithout (?:the )?(?:prior )?(?:written )?consent\b"),
+    ("exclusivity", "medium",
+     r"\bexclusive(?:ly)? (?:supplier|provider|dealer|distributor|rights?|basis)\b"),
+]
+
+# Compiled once at import; matched case-insensitively
+COMPILED_RISK_RULES = [
+    (category, severity, re.compile(pattern, re.IGNORECASE))
+    for category, severity, pattern in RISK_RULES
+]
+
+# Example risky clauses used for the optional embedding-similarity check
+RISK_PROTOTYPES = [
+    "The supplier shall be liable for all losses without any limitation.",
+    "This agreement renews automatically for successive one-year terms unless cancelled.",
+    "The company may change these terms at any time without notice to the customer.",
+    "The customer shall indemnify and hold harmless the company from any and all claims.",
+    "Either party may terminate this agreement at any time for any reason or no reason.",
+    "The employee shall not work for any competitor for five years after termination.",
+    "The customer waives all rights to bring any claim or participate in a class action.",
+    "All intellectual property created by the contractor is irrevocably assigned to the client.",
+    "Late payments incur a penalty of five percent per month.",
+]
+
+_prototype_embeddings = None
+
+def match_risk_rules(text: str) -> List[Dict[str, Any]]:
+    """Return every risk rule that matches the text with the matched excerpt"""
+    matches = []
+    for category, severity, pattern in COMPILED_RISK_RULES:
+        match = pattern.search(text)
+        if match:
+            matches.append({
+                "category": category,
+                "severity": severity,
+                "excerpt": match.group(0)
+            })
+    return matches
+
+def _prototype_similarities(clauses: List[str]) -> Optional[List[float]]:
+    """Max cosine similarity of each clause to the risk prototypes, or None if embeddings are unavailable"""
+    global _prototype_embeddings
+
+    try:
+        import numpy as np
+        from utils.vector_store import get_embeddings_model
+
+        embeddings = get_embeddings_model()
+        if _prototype_embeddings is None:
+            _prototype_embeddings = np.asarray(embeddings.embed_documents(RISK_PROTOTYPES), dtype=np.float32)
+
+        clause_embeddings = np.asarray(embeddings.embed_documents(clauses), dtype=np.float32)
+        # The embeddings model normalizes its vectors, so dot products are cosine similarities
+        return (clause_embeddings @ _prototype_embeddings.T).max(axis=1).tolist()
+    except Exception as e:
+        print(f"⚠️  Warning: Risk prototype similarity unavailable: {e}")
+        return None
+
+def select_suspicious_clauses(clauses: List[str], use_embeddings: bool = False) -> List[int]:
+    """Return the indices of clauses that should be sent to the LLM for red-flag analysis"""
+    suspicious = {i for i, clause in enumerate(clauses) if match_risk_rules(clause)}
+
+    if use_embeddings and clauses:
+        remaining = [i for i in range(len(clauses)) if i not in suspicious]
+        similarities = _prototype_similarities([clauses[i] for i in remaining]) if remaining else []
+        for i, similarity in zip(remaining, similarities or []):
+            if similarity >= RISK_PROTOTYPE_THRESHOLD:
+                suspicious.add(i)
+
+    return sorted(suspicious)
+
+def prefilter_sections(sections: List[str], use_embeddings: bool = False) -> List[Tuple[int, str]]:
+    """Reduce each section to its suspicious clauses, dropping sections with none.
+
+    Returns (index in `sections`, filtered text) pairs.
+    """
+    clauses_per_section = [split_clauses(section) for section in sections]
+    all_clauses = [clause for clauses in clauses_per_section for clause in clauses]
+    suspicious = set(select_suspicious_clauses(all_clauses, use_embeddings=use_embeddings))
+
+    filtered, offset = [], 0
+    for section_index, clauses in enumerate(clauses_per_section):
+        kept = [clause for i, clause in enumerate(clauses) if offset + i in suspicious]
+        offset += len(clauses)
+        if kept:
+            filtered.append((section_index, "\n\n".join(kept)))
+    return filtered
@@ -0,0 +1,187 @@
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Tuple, Type
+
+from utils.model_router import ModelTier, get_model_router
+
+class DeadlineExceeded(Exception):
+    """Raised when an attempt runs past its deadline"""
+
+class ResiliencePolicy:
+    """Per-call deadlines, jittered retries and optional hedging for one kind of remote call.
+
+    Each attempt gets `timeout` seconds. Failed or timed-out attempts are
+    retried up to `retries` times with full-jitter exponential backoff. With
+    hedging enabled, a duplicate attempt is fired when the first one has not
+    finished after the observed p95 latency (or `hedge_delay` until enough
+    samples exist); whichever finishes first wins and the other is abandoned.
+    Errors in `no_retry_on` are raised without retrying. Calls must be idempotent.
+
+    A deadline only stops waiting: a blocking call run in a thread keeps going
+    until it returns, holding its worker. Such calls should run on a dedicated
+    bounded executor (see utils.vector_store) so that timed-out and losing
+    hedged attempts cannot use up the default thread pool.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        retries: int = 2,
+        base_delay: float = 0.2,
+        max_delay: float = 2.0,
+        hedge: bool = False,
+        hedge_delay: float = 1.0,
+        retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+        no_retry_on: Tuple[Type[BaseException], ...] = ()
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.retry_on = retry_on
+        self.no_retry_on = no_retry_on
+        self._latencies = deque(maxlen=500)
+        self.calls = 0
+        self.retried = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _hedge_after(self) -> float:
+        """p95 of recent successful attempts, or the configured delay until there are enough samples"""
+        if len(self._latencies) < 20:
+            return self.hedge_delay
+        latencies = sorted(self._latencies)
+        return latencies[int(len(latencies) * 0.95) - 1]
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def _timed(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        started_at = time.monotonic()
+        try:
+            result = await asyncio.wait_for(call(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise DeadlineExceeded(f"{self.name} call exceeded its {self.timeout}s deadline")
+        self._latencies.append(time.monotonic() - started_at)
+        return result
+
+    async def _attempt(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.hedge:
+            return await self._timed(call)
+
+        primary = asyncio.ensure_future(self._timed(call))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self._hedge_after())
+            if done:
+                return primary.result()
+
+            self.hedges += 1
+            hedged = asyncio.ensure_future(self._timed(call))
+            tasks.add(hedged)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedged:
+                            self.hedge_wins += 1
+                        return task.result()
+            # Both attempts failed; surface the primary's error
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def run(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `call` (a zero-argument coroutine factory) under this policy"""
+        self.calls += 1
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._attempt(call)
+            except self.retry_on as e:
+                if attempt == self.retries or isinstance(e, self.no_retry_on):
+                    self.failures += 1
+                    raise
+                self.retried += 1
+                delay = self._backoff(attempt)
+                print(f"⚠️  {self.name} attempt {attempt + 1} failed ({e}); retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return call, retry, timeout and hedging counters"""
+        return {
+            "timeout_s": self.timeout,
+            "retries": self.retries,
+            "hedge": self.hedge,
+            "hedge_after_ms": round(self._hedge_after() * 1000, 2) if self.hedge else None,
+            "calls": self.calls,
+            "retried": self.retried,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins
+        }
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() == "true"
+
+def llm_policy(tier: ModelTier) -> ResiliencePolicy:
+    """Policy for provider calls on a model tier, with the tier's deadline.
+
+    A long-tier call that ran out its deadline would most likely do so again,
+    so it is not retried, and it is never hedged.
+    """
+    long_tier = tier.name == "long"
+    return ResiliencePolicy(
+        f"llm_{tier.name}",
+        timeout=tier.timeout,
+        retries=int(os.getenv("LLM_RETRIES", "2")),
+        base_delay=0.5,
+        max_delay=4.0,
+        hedge=not long_tier and _env_bool("LLM_HEDGE", "false"),
+        hedge_delay=float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "10")),
+        no_retry_on=(DeadlineExceeded,) if long_tier else ()
+    )
+
+# Policies for the remote calls on the request path
+policies: Dict[str, ResiliencePolicy] = {
+    **{f"llm_{name}": llm_policy(tier) for name, tier in get_model_router().tiers.items()},
+    "vector_query": ResiliencePolicy(
+        "vector_query",
+        timeout=float(os.getenv("VECTOR_QUERY_TIMEOUT_SECONDS", "5")),
+        retries=int(os.getenv("VECTOR_QUERY_RETRIES", "2")),
+        hedge=_env_bool("VECTOR_QUERY_HEDGE", "true"),
+        hedge_delay=float(os.getenv("VECTOR_QUERY_HEDGE_DELAY_SECONDS", "0.5"))
+    ),
+    "vector_upsert": ResiliencePolicy(
+        "vector_upsert",
+        timeout=float(os.getenv("VECTOR_UPSERT_TIMEOUT_SECONDS", "30")),
+        retries=int(os.getenv("VECTOR_UPSERT_RETRIES", "3")),
+        base_delay=0.5,
+        max_delay=5.0
+    ),
+}
+
+def get_policy(name: str) -> ResiliencePolicy:
+    """Get a resilience policy by name"""
+    return policies[name]
+
+async def resilient(name: str, call: Callable[[], Awaitable[Any]]) -> Any:
+    """Run a call under the named resilience policy"""
+    return await get_policy(name).run(call)
+
+def resilience_metrics() -> Dict[str, Any]:
+    """Return the counters of every policy"""
+    return {name: policy.metrics() for name, policy in policies.items()}
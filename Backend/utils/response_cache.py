@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+# Response cache configuration
+LLM_RESPONSE_CACHE = os.getenv("LLM_RESPONSE_CACHE", "true").lower() == "true"
+LLM_RESPONSE_CACHE_PATH = os.getenv("LLM_RESPONSE_CACHE_PATH", ".cache/llm_responses.sqlite3")
+LLM_RESPONSE_CACHE_MAX_MB = float(os.getenv("LLM_RESPONSE_CACHE_MAX_MB", "256"))
+
+# Request header that skips cached responses for the current request
+CACHE_BYPASS_HEADER = "X-LLM-Cache"
+
+# Set per request when the client sent `X-LLM-Cache: bypass`
+cache_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+def response_cache_key(model: str, prompt_key: str, rendered_prompt: str, params: Dict[str, Any]) -> str:
+    """Key a response by model, prompt version, rendered prompt and generation parameters"""
+    prompt_hash = hashlib.sha256(rendered_prompt.encode("utf-8")).hexdigest()
+    encoded_params = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(f"{model}\n{prompt_key}\n{prompt_hash}\n{encoded_params}".encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """Persistent SQLite cache of LLM responses that survives restarts.
+
+    Entries are evicted least-recently-used once the stored responses exceed
+    the size cap. Every worker process shares the file, so the size is read
+    from the table on each write rather than tracked per process. All SQLite
+    work runs off the event loop.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    prompt_key TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_accessed_at ON llm_responses (accessed_at)")
+            conn.commit()
+
+            self._size_bytes = self._stored_bytes(conn)
+            self._conn = conn
+        return self._conn
+
+    def _stored_bytes(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM llm_responses").fetchone()[0]
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT response FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            conn.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def _set(self, key: str, model: str, prompt_key: str, response: str):
+        size_bytes = len(response.encode("utf-8"))
+        if size_bytes > self.max_bytes:
+            return
+
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, model, prompt_key, response, size_bytes, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, prompt_key, response, size_bytes, now, now)
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Delete least recently used responses until the cache fits its size cap"""
+        # Runs inside the insert's write transaction, so other processes cannot change the total
+        self._size_bytes = self._stored_bytes(conn)
+        while self._size_bytes > self.max_bytes:
+            rows = conn.execute(
+                "SELECT key, size_bytes FROM llm_responses ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self._size_bytes = 0
+                return
+
+            evicted = []
+            for key, size_bytes in rows:
+                if self._size_bytes <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                self._size_bytes -= size_bytes
+
+            conn.executemany("DELETE FROM llm_responses WHERE key = ?", evicted)
+            self.evictions += len(evicted)
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return a cached response, or None on a miss or cache failure"""
+        try:
+            return await asyncio.to_thread(self._get, key)
+        except Exception as e:
+            print(f"⚠️  Warning: LLM response cache read failed: {e}")
+            return None
+
+    async def set(self, key: str, model: str, prompt_key: str, response: str):
+        """Store a response; failures are logged and ignored"""
+        try:
+            await asyncio.to_thread(self._set, key, model, prompt_key, response)
+        except Exception as e:
+            print(f"⚠️  Warning: LLM response cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit statistics"""
+        return {
+            "enabled": LLM_RESPONSE_CACHE,
+            "size_bytes": self._size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+# Global response cache instance
+response_cache = ResponseCache(
+    path=LLM_RESPONSE_CACHE_PATH,
+    max_bytes=int(LLM_RESPONSE_CACHE_MAX_MB * 1024 * 1024)
+)
+
+def get_response_cache() -> ResponseCache:
+    """Get the global LLM response cache instance"""
+    return response_cache
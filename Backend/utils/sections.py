@@ -0,0 +1,103 @@
+import re
+import zlib
+from typing import List
+
+# Lines that open a new clause or section in typical contracts
+SECTION_HEADING_PATTERN = re.compile(
+    r"^[ \t]*(?:"
+    r"(?:ARTICLE|Article|SECTION|Section|CLAUSE|Clause|SCHEDULE|Schedule|EXHIBIT|Exhibit)\s+[\dIVXLCivxlc]+[A-Za-z]?\b"
+    r"|\d{1,3}(?:\.\d{1,3})*[.)]?\s+[A-Z]"
+    r"|\([a-z0-9]{1,3}\)\s+[A-Z]"
+    r"|[A-Z][A-Z0-9 ,&'/-]{3,80}:?[ \t]*$"
+    r")",
+    re.MULTILINE
+)
+
+def split_clauses(text: str) -> List[str]:
+    """Split text into clause units at heading lines, keeping any preamble as the first unit"""
+    if not text:
+        return []
+
+    starts = [match.start() for match in SECTION_HEADING_PATTERN.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+
+    units = []
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        unit = text[start:end].strip()
+        if unit:
+            units.append(unit)
+    return units
+
+def _split_oversized(unit: str, max_chars: int) -> List[str]:
+    """Split a unit longer than max_chars on paragraph, line and finally character boundaries"""
+    for separator in ("\n\n", "\n", " "):
+        pieces = unit.split(separator)
+        if len(pieces) == 1:
+            continue
+
+        parts, current = [], ""
+        for piece in pieces:
+            candidate = f"{current}{separator}{piece}" if current else piece
+            if len(candidate) > max_chars and current:
+                parts.append(current)
+                current = piece
+            else:
+                current = candidate
+        if current:
+            parts.append(current)
+
+        if all(len(part) <= max_chars for part in parts):
+            return parts
+
+        return [sub for part in parts for sub in _split_oversized(part, max_chars)]
+
+    return [unit[i:i + max_chars] for i in range(0, len(unit), max_chars)]
+
+def _is_anchor(unit: str, anchor_every: int) -> bool:
+    """Content-defined boundary test so that edits only move nearby section boundaries"""
+    first_line = unit.split("\n", 1)[0].strip().encode("utf-8")
+    return zlib.crc32(first_line) % anchor_every == 0
+
+def split_sections(text: str, max_chars: int = 8000, min_chars: int = 2000, anchor_every: int = 3) -> List[str]:
+    """Group clause units into sections of at most max_chars.
+
+    Boundaries fall on clause headings chosen from their own content rather than
+    from running totals alone, so an edit to one clause usually leaves the other
+    sections byte-identical and their cached results reusable.
+    """
+    units = []
+    for unit in split_clauses(text):
+        units.extend(_split_oversized(unit, max_chars) if len(unit) > max_chars else [unit])
+
+    sections, current = [], ""
+    for unit in units:
+        if current and (
+            len(current) + len(unit) + 2 > max_chars
+            or (len(current) >= min_chars and _is_anchor(unit, anchor_every))
+        ):
+            sections.append(current)
+            current = ""
+        current = f"{current}\n\n{unit}" if current else unit
+
+    if current:
+        sections.append(current)
+    return sections
+
+def sample_sections(sections: List[str], max_chars: int, sample_chars: int = 500) -> List[str]:
+    """Sample the opening of every section into overview texts of at most max_chars.
+
+    Each section gets an equal share of its overview, at least sample_chars, so a
+    long document yields several overviews instead of losing its later sections.
+    """
+    per_overview = max(1, max_chars // max(1, sample_chars))
+    overviews = []
+    for start in range(0, len(sections), per_overview):
+        group = sections[start:start + per_overview]
+        # Leave room for the " ..." marker and the blank line between samples
+        share = max(1, max_chars // len(group) - 6)
+        overviews.append("\n\n".join(
+            section[:share].rstrip() + (" ..." if len(section) > share else "")
+            for section in group
+        ))
+    return overviews
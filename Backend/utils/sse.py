@@ -0,0 +1,48 @@
+import json
+import inspect
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Union
+from fastapi.responses import StreamingResponse
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """Format a payload as a single server-sent event"""
+    message = ""
+    if event:
+        message += f"event: {event}\n"
+    for line in json.dumps(data).splitlines() or [""]:
+        message += f"data: {line}\n"
+    return message + "\n"
+
+async def stream_llm_events(
+    tokens: AsyncIterator[str],
+    build_final: Callable[[str], Union[Dict[str, Any], Awaitable[Dict[str, Any]]]]
+) -> AsyncIterator[str]:
+    """Relay LLM tokens as `token` events, then send the structured payload as a `done` event.
+
+    `build_final` receives the full generated text once the stream ends. Errors
+    after the response has started are reported as an `error` event because the
+    HTTP status can no longer change.
+    """
+    parts = []
+    try:
+        async for token in tokens:
+            parts.append(token)
+            yield format_sse({"text": token}, event="token")
+
+        final = build_final("".join(parts))
+        if inspect.isawaitable(final):
+            final = await final
+        yield format_sse(final, event="done")
+    except Exception as e:
+        print(f"❌ Streaming response failed: {e}")
+        yield format_sse({"detail": str(e)}, event="error")
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """Wrap an async iterator of formatted events in a text/event-stream response"""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -0,0 +1,91 @@
+import re
+import json
+from typing import Any, List, Optional, Type, TypeVar
+from pydantic import BaseModel, ConfigDict, ValidationError, ValidationInfo, field_validator
+
+T = TypeVar("T", bound=BaseModel)
+
+_FENCE_PATTERN = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+_TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+_PYTHON_LITERALS = [(re.compile(r"\bTrue\b"), "true"), (re.compile(r"\bFalse\b"), "false"), (re.compile(r"\bNone\b"), "null")]
+
+_decoder = json.JSONDecoder()
+
+class _NullsAsDefaults(BaseModel):
+    """Treat a null field as missing, so one `"severity": null` does not discard a whole report"""
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def _null_to_default(cls, value: Any, info: ValidationInfo) -> Any:
+        if value is None:
+            return cls.model_fields[info.field_name].get_default(call_default_factory=True)
+        return value
+
+class RedFlag(_NullsAsDefaults):
+    model_config = ConfigDict(extra="allow")
+
+    type: Optional[str] = ""
+    description: Optional[str] = ""
+    severity: Optional[str] = "unknown"
+    suggestion: Optional[str] = ""
+
+class RedFlagReport(_NullsAsDefaults):
+    model_config = ConfigDict(extra="allow")
+
+    red_flags: Optional[List[RedFlag]] = []
+    overall_risk_level: Optional[str] = "unknown"
+    summary: Optional[str] = ""
+
+def _repair(text: str) -> str:
+    """Fix the trivial mistakes models make in JSON: smart quotes, trailing commas, Python literals"""
+    text = text.translate(_SMART_QUOTES)
+    text = _TRAILING_COMMA_PATTERN.sub(r"\1", text)
+    for pattern, replacement in _PYTHON_LITERALS:
+        text = pattern.sub(replacement, text)
+    return text
+
+def _decode_first_object(text: str) -> Any:
+    """Decode the first JSON object or array in text, ignoring anything around it"""
+    starts = [position for position in (text.find("{"), text.find("[")) if position != -1]
+    if not starts:
+        raise ValueError("No JSON object found")
+    value, _ = _decoder.raw_decode(text, min(starts))
+    return value
+
+def extract_json(raw_text: str) -> Any:
+    """Parse JSON from a model response.
+
+    Tries a plain parse first, then the contents of a code fence, then the
+    first complete object in the text, each again after trivial repairs.
+    Raises ValueError if nothing parses.
+    """
+    text = (raw_text or "").strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    fenced = _FENCE_PATTERN.search(text)
+    candidates = [fenced.group(1).strip()] if fenced else []
+    candidates.append(text)
+
+    for candidate in candidates:
+        for attempt in (candidate, _repair(candidate)):
+            try:
+                return json.loads(attempt)
+            except ValueError:
+                pass
+            try:
+                return _decode_first_object(attempt)
+            except ValueError:
+                pass
+
+    raise ValueError("Response is not valid JSON")
+
+def parse_structured(raw_text: str, schema: Type[T]) -> Optional[T]:
+    """Parse and validate a model response against a Pydantic schema, or None if it does not fit"""
+    try:
+        return schema.model_validate(extract_json(raw_text))
+    except (ValueError, ValidationError):
+        return None
@@ -0,0 +1,140 @@
+import os
+import json
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from utils.llm_gateway import current_user_id
+
+# Price per million tokens by model, e.g. {"gemini-2.0-flash-exp": {"input": 0.1, "output": 0.4}}
+LLM_PRICING = json.loads(os.getenv("LLM_PRICING", "{}") or "{}")
+
+# Endpoint ("METHOD /route/{param}") on whose behalf LLM calls in the current request are made
+current_endpoint: ContextVar[Optional[str]] = ContextVar("current_endpoint", default=None)
+
+_encoding = None
+
+def count_tokens(text: str) -> int:
+    """Estimate a token count with tiktoken, or about four characters per token without it"""
+    global _encoding
+
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+
+    if _encoding:
+        return len(_encoding.encode(text or "", disallowed_special=()))
+    return len(text or "") // 4
+
+def response_token_counts(response: Any, prompt: str, completion: str) -> Dict[str, Any]:
+    """Token counts reported by the provider, falling back to estimates"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage.get("input_tokens") is not None and usage.get("output_tokens") is not None:
+        return {"input_tokens": usage["input_tokens"], "output_tokens": usage["output_tokens"], "estimated": False}
+    return {"input_tokens": count_tokens(prompt), "output_tokens": count_tokens(completion), "estimated": True}
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """Cost in USD from LLM_PRICING, or 0 for models without a price"""
+    price = LLM_PRICING.get(model) or {}
+    return (input_tokens * price.get("input", 0) + output_tokens * price.get("output", 0)) / 1_000_000
+
+def _new_totals() -> Dict[str, Any]:
+    return {
+        "calls": 0,
+        "cache_hits": 0,
+        "shared_calls": 0,
+        "estimated_calls": 0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cost_usd": 0.0,
+        "wall_time_ms": 0.0,
+        "max_wall_time_ms": 0.0
+    }
+
+class UsageTracker:
+    """In-process token, latency and cost totals per endpoint, user, model and prompt"""
+
+    def __init__(self):
+        self._totals: Dict[str, Dict[str, Dict[str, Any]]] = {
+            "endpoint": {},
+            "user": {},
+            "model": {},
+            "prompt": {}
+        }
+        self._overall = _new_totals()
+
+    def record(
+        self,
+        prompt: str,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        wall_time: float,
+        cached: bool = False,
+        estimated: bool = False,
+        endpoint: Optional[str] = None,
+        user_id: Optional[str] = None,
+        shared: bool = False
+    ):
+        """Add one LLM invocation, response cache hit or shared in-flight result to the totals.
+
+        Cache hits and shared results (a caller coalesced onto an identical
+        in-flight call) cost nothing and carry no tokens.
+        """
+        keys = {
+            "endpoint": endpoint or current_endpoint.get() or "background",
+            "user": user_id or current_user_id.get() or "anonymous",
+            "model": model,
+            "prompt": prompt
+        }
+        wall_time_ms = wall_time * 1000
+        cost = 0.0 if cached or shared else estimate_cost(model, input_tokens, output_tokens)
+
+        for dimension, key in keys.items():
+            self._add(self._totals[dimension].setdefault(key, _new_totals()), input_tokens, output_tokens, wall_time_ms, cost, cached, estimated, shared)
+        self._add(self._overall, input_tokens, output_tokens, wall_time_ms, cost, cached, estimated, shared)
+
+    @staticmethod
+    def _add(totals: Dict[str, Any], input_tokens: int, output_tokens: int, wall_time_ms: float, cost: float, cached: bool, estimated: bool, shared: bool = False):
+        totals["calls"] += 1
+        totals["cache_hits"] += int(cached)
+        totals["shared_calls"] += int(shared)
+        totals["estimated_calls"] += int(estimated)
+        totals["input_tokens"] += input_tokens
+        totals["output_tokens"] += output_tokens
+        totals["cost_usd"] += cost
+        totals["wall_time_ms"] += wall_time_ms
+        totals["max_wall_time_ms"] = max(totals["max_wall_time_ms"], wall_time_ms)
+
+    @staticmethod
+    def _summarize(totals: Dict[str, Any]) -> Dict[str, Any]:
+        calls = totals["calls"]
+        return {
+            **totals,
+            "cost_usd": round(totals["cost_usd"], 6),
+            "wall_time_ms": round(totals["wall_time_ms"], 2),
+            "max_wall_time_ms": round(totals["max_wall_time_ms"], 2),
+            "avg_wall_time_ms": round(totals["wall_time_ms"] / calls, 2) if calls else 0.0
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """Return totals overall and per endpoint, user, model and prompt, most tokens first"""
+        report = {"totals": self._summarize(self._overall)}
+        for dimension, groups in self._totals.items():
+            report[f"by_{dimension}"] = {
+                key: self._summarize(totals)
+                for key, totals in sorted(
+                    groups.items(),
+                    key=lambda item: -(item[1]["input_tokens"] + item[1]["output_tokens"])
+                )
+            }
+        return report
+
+# Global usage tracker instance
+usage_tracker = UsageTracker()
+
+def get_usage_tracker() -> UsageTracker:
+    """Get the global usage tracker instance"""
+    return usage_tracker
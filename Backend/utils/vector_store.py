@@ -1,15 +1,34 @@
 import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pinecone import Pinecone, ServerlessSpec
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.embeddings import HuggingFaceEmbeddings
 import tiktoken
 
+from utils.resilience import resilient
+from utils.answer_cache import content_version
+from utils.chunk_store import put_document_chunks, drop_document_chunks
+
 # Global Pinecone client, index, and embeddings model
 pinecone_client = None
 pinecone_index = None
 embeddings_model = None
 
+# Blocking Pinecone calls run on their own bounded pool. A deadline or a lost hedge
+# only stops waiting for a call: its thread keeps running until Pinecone answers,
+# so at most PINECONE_MAX_WORKERS such calls can be outstanding, and the default
+# executor used by the rest of the app is never exhausted by them.
+PINECONE_MAX_WORKERS = int(os.getenv("PINECONE_MAX_WORKERS", "16"))
+_pinecone_executor = ThreadPoolExecutor(max_workers=PINECONE_MAX_WORKERS, thread_name_prefix="pinecone")
+
+async def run_pinecone(call: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking Pinecone call on the Pinecone thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pinecone_executor, functools.partial(call, *args, **kwargs))
+
 async def init_pinecone():
     """Initialize Pinecone client and index"""
     global pinecone_client, pinecone_index
@@ -106,6 +125,30 @@ def chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> L
     )
     return text_splitter.split_text(text)
 
+def chunk_text_with_offsets(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Dict[str, Any]]:
+    """Split text into ordered chunks with their character offsets in the source text"""
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=["\n\n", "\n", " ", ""],
+        add_start_index=True
+    )
+    
+    chunks = []
+    for i, document in enumerate(text_splitter.create_documents([text])):
+        start = document.metadata.get("start_index", -1)
+        if start < 0:
+            # Fall back to the previous chunk's position if the splitter could not locate the chunk
+            start = chunks[-1]["start"] if chunks else 0
+        chunks.append({
+            "index": i,
+            "text": document.page_content,
+            "start": start,
+            "end": start + len(document.page_content)
+        })
+    return chunks
+
 async def store_document_chunks(doc_id: str, text: str, metadata: Dict[str, Any] = None):
     """Store document chunks in Pinecone with document-specific namespace"""
     index = get_pinecone_index()
@@ -113,8 +156,8 @@ async def store_document_chunks(doc_id: str, text: str, metadata: Dict[str, Any]
     # Use document ID as namespace
     namespace = f"doc_{doc_id}"
     
-    # Split text into chunks
-    chunks = chunk_text(text)
+    # Split text into chunks, keeping order and offsets for neighbor expansion
+    chunks = chunk_text_with_offsets(text)
     print(f"📄 Split document into {len(chunks)} chunks")
     print(f"🏷️  Using namespace: {namespace}")
     
@@ -127,9 +170,10 @@ async def store_document_chunks(doc_id: str, text: str, metadata: Dict[str, Any]
     
     # Prepare vectors for Pinecone
     vectors = []
-    for i, chunk in enumerate(chunks):
+    for chunk in chunks:
+        i = chunk["index"]
         try:
-            embedding = embeddings.embed_query(chunk)
+            embedding = embeddings.embed_query(chunk["text"])
             
             # Verify embedding dimension
             if len(embedding) != 768:
@@ -141,7 +185,9 @@ async def store_document_chunks(doc_id: str, text: str, metadata: Dict[str, Any]
                 "metadata": {
                     "doc_id": doc_id,
                     "chunk_index": i,
-                    "text": chunk,
+                    "start_offset": chunk["start"],
+                    "end_offset": chunk["end"],
+                    "text": chunk["text"],
                     **(metadata or {})
                 }
             }
@@ -153,46 +199,55 @@ async def store_document_chunks(doc_id: str, text: str, metadata: Dict[str, Any]
     
     # Upsert to Pinecone with namespace
     try:
-        index.upsert(vectors=vectors, namespace=namespace)
+        # Upserts are idempotent (vector ids are chunk indices), so they are safe to retry
+        await resilient("vector_upsert", lambda: run_pinecone(index.upsert, vectors=vectors, namespace=namespace))
+        put_document_chunks(doc_id, content_version(text), chunks)
         print(f"✅ Successfully stored {len(chunks)} chunks for document {doc_id} in namespace {namespace}")
         return len(chunks)
     except Exception as e:
         print(f"❌ Failed to upsert vectors to Pinecone: {e}")
         raise
 
-async def search_similar_chunks(query: str, doc_id: str = None, top_k: int = 5) -> List[Dict]:
-    """Search for similar chunks in Pinecone with namespace support"""
-    index = get_pinecone_index()
+def embed_queries(queries: List[str]) -> List[List[float]]:
+    """Embed several queries in a single batch with the global embeddings model"""
+    embeddings = get_embeddings_model()
+    query_embeddings = embeddings.embed_documents(queries)
     
-    try:
-        # Use global embeddings model
-        embeddings = get_embeddings_model()
-        query_embedding = embeddings.embed_query(query)
-        
-        # Verify embedding dimension
+    for query_embedding in query_embeddings:
         if len(query_embedding) != 768:
             print(f"⚠️  Warning: Query embedding dimension is {len(query_embedding)}, expected 768")
-        
-        # If doc_id is provided, search in that document's namespace
+            break
+    
+    return query_embeddings
+
+async def search_chunks_by_embedding(query_embedding: List[float], doc_id: str = None, top_k: int = 5) -> List[Dict]:
+    """Search for similar chunks in Pinecone using a precomputed query embedding"""
+    index = get_pinecone_index()
+    
+    try:
+        # Run the blocking Pinecone query on the Pinecone pool so retrievals can overlap,
+        # with a deadline, retries and a hedged duplicate for slow responses
         if doc_id:
             namespace = f"doc_{doc_id}"
             print(f"🔍 Searching in namespace: {namespace}")
             
-            results = index.query(
+            results = await resilient("vector_query", lambda: run_pinecone(
+                index.query,
                 vector=query_embedding,
                 top_k=top_k,
                 namespace=namespace,
                 include_metadata=True
-            )
+            ))
         else:
             # Search across all namespaces (all documents)
             print(f"🔍 Searching across all namespaces")
             
-            results = index.query(
+            results = await resilient("vector_query", lambda: run_pinecone(
+                index.query,
                 vector=query_embedding,
                 top_k=top_k,
                 include_metadata=True
-            )
+            ))
         
         print(f"🔍 Found {len(results.matches)} similar chunks")
         return results.matches
@@ -201,12 +256,34 @@ async def search_similar_chunks(query: str, doc_id: str = None, top_k: int = 5)
         print(f"❌ Failed to search Pinecone: {e}")
         raise
 
+def embed_query(query: str) -> List[float]:
+    """Embed a single query with the global embeddings model"""
+    embeddings = get_embeddings_model()
+    query_embedding = embeddings.embed_query(query)
+    
+    # Verify embedding dimension
+    if len(query_embedding) != 768:
+        print(f"⚠️  Warning: Query embedding dimension is {len(query_embedding)}, expected 768")
+    
+    return query_embedding
+
+async def search_similar_chunks(query: str, doc_id: str = None, top_k: int = 5) -> List[Dict]:
+    """Search for similar chunks in Pinecone with namespace support"""
+    try:
+        query_embedding = embed_query(query)
+    except Exception as e:
+        print(f"❌ Failed to embed query: {e}")
+        raise
+    
+    return await search_chunks_by_embedding(query_embedding, doc_id=doc_id, top_k=top_k)
+
 async def delete_document_chunks(doc_id: str):
     """Delete all chunks for a document using namespace"""
     index = get_pinecone_index()
     
     # Use document ID as namespace
     namespace = f"doc_{doc_id}"
+    drop_document_chunks(doc_id)
     
     try:
         # Delete all vectors in the namespace
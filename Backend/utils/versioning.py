@@ -0,0 +1,70 @@
+import re
+import zlib
+import json
+import base64
+import difflib
+from typing import List, Union
+
+# A delta is a list of operations applied to the tokens of the previous version:
+# [start, end] copies those tokens of the previous version, a string inserts new text.
+DeltaOp = Union[List[int], str]
+
+# Documents are saved as single-line HTML by the editor, so the diff works on
+# tags and sentence-sized runs of text rather than lines
+_TAG_PATTERN = re.compile(r"(<[^>]*>)")
+_SENTENCE_PATTERN = re.compile(r"[^.!?;\n]*[.!?;\n]?\s*")
+
+def tokenize(text: str) -> List[str]:
+    """Split text into tags and sentence-sized text runs; joining the tokens gives the text back"""
+    tokens = []
+    for part in _TAG_PATTERN.split(text or ""):
+        if part.startswith("<"):
+            tokens.append(part)
+        elif part:
+            tokens.extend(run for run in _SENTENCE_PATTERN.findall(part) if run)
+    return tokens
+
+def diff_ops(old: str, new: str) -> List[DeltaOp]:
+    """Token-level operations that turn `old` into `new`"""
+    old_tokens = tokenize(old)
+    new_tokens = tokenize(new)
+
+    # Most saves change one region; match the unchanged head and tail directly
+    # so the matcher only sees the edited middle
+    prefix = 0
+    limit = min(len(old_tokens), len(new_tokens))
+    while prefix < limit and old_tokens[prefix] == new_tokens[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old_tokens[-1 - suffix] == new_tokens[-1 - suffix]:
+        suffix += 1
+
+    ops: List[DeltaOp] = [[0, prefix]] if prefix else []
+    matcher = difflib.SequenceMatcher(
+        None,
+        old_tokens[prefix:len(old_tokens) - suffix],
+        new_tokens[prefix:len(new_tokens) - suffix],
+        autojunk=False
+    )
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([prefix + i1, prefix + i2])
+        elif j2 > j1:
+            ops.append("".join(new_tokens[prefix + j1:prefix + j2]))
+    if suffix:
+        ops.append([len(old_tokens) - suffix, len(old_tokens)])
+    return ops
+
+def encode_delta(old: str, new: str) -> str:
+    """Compressed delta from `old` to `new`; its size grows with the change, not the document"""
+    payload = json.dumps({"tokens": "sentence", "ops": diff_ops(old, new)}, separators=(",", ":")).encode("utf-8")
+    return base64.b64encode(zlib.compress(payload, 9)).decode("ascii")
+
+def apply_delta(old: str, delta: str) -> str:
+    """Rebuild a version from the previous version and its encoded delta"""
+    payload = json.loads(zlib.decompress(base64.b64decode(delta)))
+    old_tokens = tokenize(old)
+    return "".join(
+        "".join(old_tokens[op[0]:op[1]]) if isinstance(op, list) else op
+        for op in payload["ops"]
+    )
@@ -0,0 +1,211 @@
+import os
+import json
+import asyncio
+from contextlib import suppress
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+class WriteBehindQueue:
+    """Buffers rows in memory and writes them in batches off the request path.
+
+    Rows are flushed every `flush_interval` seconds, or as soon as `max_batch`
+    are pending. A failed batch is halved until the rows that fail on their own
+    are isolated. A row that fails alone with a permanent error (`is_permanent`)
+    goes to `dead_letter_path`; any other failure means the store is unavailable,
+    so that row and every row after it stay queued for the next flush. Rows are
+    removed from the queue only once written or dead-lettered, and a batch may
+    be retried after a partial write, so `write_batch` must be idempotent.
+
+    At most `max_pending` rows are held; `put` refuses rows beyond that so the
+    caller can write them directly. On shutdown the queue is drained; rows that
+    still cannot be written are spilled to `spill_path` and replayed on the
+    next start.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        write_batch: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+        flush_interval: float = 0.5,
+        max_batch: int = 100,
+        max_pending: int = 10000,
+        is_permanent: Callable[[Exception], bool] = lambda error: False,
+        spill_path: Optional[str] = None,
+        dead_letter_path: Optional[str] = None
+    ):
+        self.name = name
+        self.write_batch = write_batch
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.is_permanent = is_permanent
+        self.spill_path = spill_path
+        self.dead_letter_path = dead_letter_path
+        self._pending: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_error: Optional[Exception] = None
+        self.healthy = True
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.dead_lettered = 0
+        self.rejected = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Replay spilled rows and start the background flusher"""
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._load_spill()
+        self._task = asyncio.create_task(self._run())
+
+    def put(self, row: Dict[str, Any]) -> bool:
+        """Queue a row for writing; returns False if the queue is full"""
+        if len(self._pending) >= self.max_pending:
+            self.rejected += 1
+            return False
+
+        self._pending.append(row)
+        if len(self._pending) >= self.max_batch and self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def flush(self) -> bool:
+        """Write every pending row in batches; returns False if the store was unavailable"""
+        async with self._lock:
+            while self._pending:
+                batch = self._pending[:self.max_batch]
+                done, failed, complete = await self._write_isolating(batch)
+
+                # Rows queued while the batch was written were appended after it
+                del self._pending[:done]
+                self._dead_letter(failed)
+                self.written += done - len(failed)
+
+                if not complete:
+                    self.failures += 1
+                    self.healthy = False
+                    print(f"⚠️  Warning: {self.name} write-behind flush failed ({len(self._pending)} rows pending): {self._last_error}")
+                    return False
+
+                self.healthy = True
+                self.batches += 1
+            return True
+
+    async def close(self, attempts: int = 3):
+        """Stop the flusher and drain the queue, spilling rows that cannot be written"""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+        if self._lock is None:
+            return
+
+        for attempt in range(attempts):
+            if await self.flush():
+                return
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+        self._spill()
+
+    def stats(self) -> dict:
+        """Return queue depth and write statistics"""
+        return {
+            "pending": len(self._pending),
+            "healthy": self.healthy,
+            "written": self.written,
+            "batches": self.batches,
+            "failures": self.failures,
+            "dead_lettered": self.dead_lettered,
+            "rejected": self.rejected
+        }
+
+    async def _try_write(self, rows: List[Dict[str, Any]]) -> bool:
+        try:
+            await self.write_batch(rows)
+            return True
+        except Exception as e:
+            self._last_error = e
+            return False
+
+    async def _write_isolating(self, batch: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]], bool]:
+        """Write a batch in order, halving parts that fail.
+
+        Returns how many leading rows of the batch were handled (written or
+        failed permanently), the permanently failed rows among them, and whether
+        the whole batch was handled. A row that fails alone with a transient
+        error stops the write; an outage is found in about log2(len(batch))
+        writes, not one per row.
+        """
+        failed: List[Dict[str, Any]] = []
+        done = 0
+        parts = [batch]
+        while parts:
+            rows = parts.pop(0)
+            if await self._try_write(rows):
+                done += len(rows)
+                continue
+            if len(rows) > 1:
+                middle = len(rows) // 2
+                parts[:0] = [rows[:middle], rows[middle:]]
+                continue
+            if not self.is_permanent(self._last_error):
+                return done, failed, False
+            failed.append(rows[0])
+            done += 1
+        return done, failed, True
+
+    async def _run(self):
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    def _append_rows(self, path: str, rows: List[Dict[str, Any]]):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+
+    def _dead_letter(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        self.dead_lettered += len(rows)
+        if not self.dead_letter_path:
+            print(f"❌ {self.name} write-behind queue dropped {len(rows)} rows that cannot be written: {self._last_error}")
+            return
+
+        self._append_rows(self.dead_letter_path, rows)
+        print(f"⚠️  Warning: Moved {len(rows)} {self.name} rows that cannot be written to {self.dead_letter_path}: {self._last_error}")
+
+    def _spill(self):
+        if not self._pending:
+            return
+        if not self.spill_path:
+            print(f"❌ {self.name} write-behind queue lost {len(self._pending)} rows on shutdown")
+            return
+
+        self._append_rows(self.spill_path, self._pending)
+        print(f"⚠️  Warning: Spilled {len(self._pending)} {self.name} rows to {self.spill_path}")
+        self._pending.clear()
+
+    def _load_spill(self):
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+
+        with open(self.spill_path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        os.remove(self.spill_path)
+        self._pending[:0] = rows
+        if rows:
+            print(f"✅ Replaying {len(rows)} spilled {self.name} rows")
@@ -64,7 +64,8 @@ const DocumentEditor = () => {
   const loadChatHistory = async () => {
     try {
       const response = await qaAPI.getChatHistory(id);
-      setChatHistory(Array.isArray(response.data) ? response.data : []);
+      // Newest first from the API; the chat panel shows oldest first
+      setChatHistory([...(response.data?.chat_history || [])].reverse());
     } catch (error) {
       console.error('Error loading chat history:', error);
       setChatHistory([]);
@@ -37,6 +37,8 @@ const DocumentsList = () => {
   const [filter, setFilter] = useState('all'); // all, recent, favorites
   const [viewMode, setViewMode] = useState('grid'); // grid, list
   const [deletingDocId, setDeletingDocId] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     loadDocuments();
@@ -49,6 +51,7 @@ const DocumentsList = () => {
       console.log('API Response:', response);
       console.log('Documents data:', response.data);
       setDocuments(response.data?.documents || []);
+      setNextCursor(response.data?.next_cursor || null);
     } catch (error) {
       console.error('Error loading documents:', error);
       toast.error('Failed to load documents');
@@ -58,6 +61,20 @@ const DocumentsList = () => {
     }
   };
 
+  const loadMoreDocuments = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await documentAPI.getAll({ cursor: nextCursor });
+      setDocuments(prev => [...prev, ...(response.data?.documents || [])]);
+      setNextCursor(response.data?.next_cursor || null);
+    } catch (error) {
+      console.error('Error loading more documents:', error);
+      toast.error('Failed to load more documents');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDelete = async (documentId) => {
     const document = documents.find(doc => doc.id === documentId);
     const documentName = document?.title || 'this document';
@@ -79,7 +96,7 @@ const DocumentsList = () => {
 
   const filteredDocuments = (documents || []).filter(doc => {
     const matchesSearch = doc.title?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                         doc.content?.toLowerCase().includes(searchTerm.toLowerCase());
+                         doc.file_name?.toLowerCase().includes(searchTerm.toLowerCase());
     
     if (filter === 'recent') {
       const oneWeekAgo = new Date();
@@ -421,7 +438,7 @@ const DocumentsList = () => {
                       </div>
 
                       <p className="text-xs text-gray-600 line-clamp-2 leading-relaxed">
-                        {document.content?.substring(0, 100) || 'No content preview available...'}
+                        {document.file_name ? `Uploaded from ${document.file_name}` : 'Created in the editor'}
                       </p>
 
                       <div className="flex items-center justify-between pt-3 border-t border-gray-100">
@@ -470,6 +487,19 @@ const DocumentsList = () => {
             })}
           </div>
         )}
+
+        {nextCursor && (
+          <div className="flex justify-center mt-8">
+            <button
+              onClick={loadMoreDocuments}
+              disabled={loadingMore}
+              className="flex items-center space-x-2 px-6 py-3 border border-gray-300 text-gray-700 rounded-lg hover:bg-gray-50 transition-all duration-200 font-semibold disabled:opacity-50"
+            >
+              {loadingMore && <Loader2 size={16} className="animate-spin" />}
+              <span>{loadingMore ? 'Loading...' : 'Load more documents'}</span>
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
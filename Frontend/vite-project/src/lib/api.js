@@ -68,9 +68,9 @@ export const documentAPI = {
     });
   },
 
-  // Get all documents
-  getAll: async () => {
-    return api.get('/api/documents/');
+  // Get a page of documents (listing fields only); pass the previous response's next_cursor for more
+  getAll: async (params = {}) => {
+    return api.get('/api/documents/', { params });
   },
 
   // Get single document
@@ -100,8 +100,8 @@ export const qaAPI = {
   },
 
   // Get chat history
-  getChatHistory: async (documentId) => {
-    return api.get(`/api/qa/chat-history/${documentId}`);
+  getChatHistory: async (documentId, params = {}) => {
+    return api.get(`/api/qa/chat-history/${documentId}`, { params });
   },
 
   // Analyze document